@@ -1,48 +1,65 @@
-import sqlite3
 import os
+import sys
+import argparse
+import asyncio
 
-# Database file path
-DB_FILE = "./data/12306.db"
+# Ensure the backend directory is importable and relative paths (./data) resolve
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
 
-def migrate():
-    if not os.path.exists(DB_FILE):
-        print(f"Database file {DB_FILE} not found!")
-        return
+from sqlalchemy import inspect
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
+import app.models  # noqa: F401  register tables
+import app.models.config  # noqa: F401
+from app.core.database import engine, init_db, close_db
+from app.tasks.retention import enable_incremental_vacuum
+
+
+def _describe(conn):
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+    columns = [c["name"] for c in inspector.get_columns("tasks")] if "tasks" in tables else []
+    return tables, columns
+
+
+async def migrate(incremental_vacuum: bool = False):
+    """
+    Bring an existing database up to the current schema.
+
+    Works on every backend supported by DATABASE_URL (SQLite / PostgreSQL):
+    creates missing tables (system_configs, ...), adds missing columns
+    (tasks.allow_scheduled_start, ...) and missing indexes.
+
+    With incremental_vacuum, a SQLite database is also switched to
+    auto_vacuum=INCREMENTAL so the log retention job can return freed pages
+    to disk. This rewrites the whole file with VACUUM; stop the server first.
+    """
+    print(f"Migrating {engine.url.render_as_string(hide_password=True)} ...")
     try:
-        # 1. Create system_configs table
-        print("Creating system_configs table...")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS system_configs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key VARCHAR(50) UNIQUE NOT NULL,
-                value TEXT,
-                description TEXT,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # 2. Add allow_scheduled_start column to tasks table
-        cursor.execute("PRAGMA table_info(tasks)")
-        columns = [info[1] for info in cursor.fetchall()]
-        
+        await init_db()
+        async with engine.connect() as conn:
+            tables, columns = await conn.run_sync(_describe)
+        print(f"Tables: {', '.join(sorted(tables))}")
         if "allow_scheduled_start" in columns:
-            print("Column 'allow_scheduled_start' already exists.")
-        else:
-            print("Adding 'allow_scheduled_start' column to tasks...")
-            cursor.execute("ALTER TABLE tasks ADD COLUMN allow_scheduled_start BOOLEAN DEFAULT 1")
-        
-        conn.commit()
+            print("Column 'allow_scheduled_start' present.")
+        if incremental_vacuum:
+            if await enable_incremental_vacuum():
+                print("SQLite switched to auto_vacuum=INCREMENTAL.")
+            else:
+                print("Incremental vacuum already enabled or not applicable.")
         print("Migration successful!")
-            
     except Exception as e:
         print(f"Error: {e}")
-        conn.rollback()
     finally:
-        conn.close()
+        await close_db()
+
 
 if __name__ == "__main__":
-    migrate()
+    parser = argparse.ArgumentParser(description="Migrate the database to the current schema")
+    parser.add_argument(
+        "--enable-incremental-vacuum", action="store_true",
+        help="switch SQLite to auto_vacuum=INCREMENTAL (runs a full VACUUM; stop the server first)"
+    )
+    args = parser.parse_args()
+    asyncio.run(migrate(incremental_vacuum=args.enable_incremental_vacuum))
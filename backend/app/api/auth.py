@@ -13,7 +13,7 @@ from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, De
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models.user import User
 from ..schemas.user import (
     UserCreate, UserResponse, LoginStatusResponse,
@@ -21,6 +21,7 @@ from ..schemas.user import (
 )
 from ..schemas.common import ResponseBase
 from ..services.login_service import LoginService, QRCodeStatus
+from ..tasks.scheduler import get_scheduler
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
@@ -69,7 +70,7 @@ async def create_user(
 
 
 @router.get("/users", response_model=ResponseBase[list])
-async def list_users(db: AsyncSession = Depends(get_db)):
+async def list_users(db: AsyncSession = Depends(get_read_db)):
     """获取用户列表"""
     stmt = select(User).where(User.is_active == True)
     result = await db.execute(stmt)
@@ -82,7 +83,7 @@ async def list_users(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/users/{user_id}", response_model=ResponseBase[UserResponse])
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """获取用户信息"""
     stmt = select(User).where(User.id == user_id)
     result = await db.execute(stmt)
@@ -211,6 +212,7 @@ async def check_qr_status(
                     user.session_data = json.dumps(login_service.session.to_dict())
                     user.login_time = login_service.session.login_time
                     await db.commit()
+                    get_scheduler().invalidate_user(user_id)
         
         return ResponseBase(
             success=True,
@@ -322,6 +324,7 @@ async def logout(
     user.is_logged_in = False
     user.session_data = None
     await db.commit()
+    get_scheduler().invalidate_user(user_id)
     
     return ResponseBase(success=True, message="已登出")
 
@@ -348,5 +351,6 @@ async def delete_user(
     user.is_logged_in = False
     user.session_data = None
     await db.commit()
+    get_scheduler().invalidate_user(user_id)
     
     return ResponseBase(success=True, message="用户已删除")
@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from pydantic import BaseModel, Field
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models.config import SystemConfig
 from ..tasks.scheduler import get_scheduler
 
@@ -27,7 +27,7 @@ class ConfigResponse(BaseModel):
 
 
 @router.get("/config/global-schedule", response_model=ConfigResponse)
-async def get_global_schedule(db: AsyncSession = Depends(get_db)):
+async def get_global_schedule(db: AsyncSession = Depends(get_read_db)):
     """获取全局定时配置"""
     # 获取 Cron
     stub_cron = await db.execute(select(SystemConfig).where(SystemConfig.key == "global_schedule_cron"))
@@ -86,7 +86,7 @@ async def update_global_schedule(
 
 
 @router.get("/config/notification")
-async def get_notification_config(db: AsyncSession = Depends(get_db)):
+async def get_notification_config(db: AsyncSession = Depends(get_read_db)):
     """获取通知配置"""
     stmt = select(SystemConfig).where(SystemConfig.key == "notification_settings")
     result = await db.execute(stmt)
@@ -138,7 +138,7 @@ async def test_notification(
     from ..utils import notify
     
     try:
-        notify.send("测试通知", "恭喜！您的通知服务配置成功。\n这是一条由于点击[发送测试]按钮触发的消息。", ignore_default_config=True, **config)
+        await notify.send_async("测试通知", "恭喜！您的通知服务配置成功。\n这是一条由于点击[发送测试]按钮触发的消息。", ignore_default_config=True, **config)
         return {"success": True, "message": "测试请求已发送，请检查接收端"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
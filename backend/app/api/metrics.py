@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+运行指标 API
+
+提供缓存命中率、请求耗时分布、刷票节拍延迟、下单步骤耗时等运行时统计，用于调优相关配置
+"""
+
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_read_db
+from ..core.http import get_latency_stats, reset_latency_stats
+from ..models.task import OrderSpan, china_now
+from ..schemas.common import ResponseBase
+from ..services.query_service import get_query_broker
+from ..tasks.scheduler import get_scheduler
+from ..tasks.spans import summarize_spans
+
+router = APIRouter(prefix="/metrics", tags=["监控"])
+
+
+@router.get("/query-cache", response_model=ResponseBase[dict])
+async def get_query_cache_stats():
+    """获取查票缓存统计（命中/未命中/合并次数等）"""
+    return ResponseBase(success=True, data=get_query_broker().get_stats())
+
+
+@router.get("/http-latency", response_model=ResponseBase[dict])
+async def get_http_latency_stats():
+    """
+    获取 12306 请求耗时直方图
+    
+    按客户端分组（*.pooled 为共享连接池，*.direct 为独立连接），
+    可切换 HTTP_POOL_ENABLED 前后对比
+    """
+    return ResponseBase(success=True, data=get_latency_stats())
+
+
+@router.delete("/http-latency", response_model=ResponseBase)
+async def clear_http_latency_stats():
+    """清空请求耗时统计"""
+    reset_latency_stats()
+    return ResponseBase(success=True, message="已清空")
+
+
+@router.get("/scheduler", response_model=ResponseBase[dict])
+async def get_scheduler_stats():
+    """获取刷票节拍统计（任务数、跳过的重叠节拍、节拍延迟分布）"""
+    return ResponseBase(success=True, data=get_scheduler().ticker.get_stats())
+
+
+@router.get("/task-logs", response_model=ResponseBase[dict])
+async def get_task_log_stats():
+    """获取任务日志缓冲写入统计（队列长度、批量大小、丢弃条数）"""
+    return ResponseBase(success=True, data=get_scheduler().log_sink.get_stats())
+
+
+@router.get("/order-latency", response_model=ResponseBase[dict])
+async def get_order_latency_stats(
+    days: int = Query(7, ge=1, le=365, description="统计最近天数"),
+    group_by: str = Query("version", pattern="^(version|deployment|all)$", description="分组方式"),
+    task_id: Optional[int] = Query(None, description="仅统计指定任务"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    获取下单各步骤耗时分位数
+    
+    按版本（version）或部署（deployment）分组，用于对比不同发布/部署的下单耗时
+    """
+    group_column = {
+        "version": OrderSpan.app_version,
+        "deployment": OrderSpan.deployment,
+    }.get(group_by)
+    stmt = select(
+        group_column if group_column is not None else OrderSpan.app_version,
+        OrderSpan.step, OrderSpan.elapsed_ms, OrderSpan.ok
+    ).where(OrderSpan.created_at >= china_now() - timedelta(days=days))
+    if task_id is not None:
+        stmt = stmt.where(OrderSpan.task_id == task_id)
+    
+    result = await db.execute(stmt)
+    rows = (
+        (group if group_column is not None else "all", step, elapsed_ms, ok)
+        for group, step, elapsed_ms, ok in result
+    )
+    return ResponseBase(success=True, data=summarize_spans(rows))
+
+
+@router.get("/notifications", response_model=ResponseBase[dict])
+async def get_notification_stats():
+    """获取通知推送统计（队列长度、合并条数、推送成功/失败数）"""
+    return ResponseBase(success=True, data=get_scheduler().notifier.get_stats())
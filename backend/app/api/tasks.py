@@ -9,9 +9,9 @@ from typing import Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, Query, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..models.user import User
 from ..models.task import Task, TaskLog, TaskStatus
 from ..schemas.task import (
@@ -24,6 +24,32 @@ from ..tasks.scheduler import get_scheduler
 router = APIRouter(prefix="/tasks", tags=["任务"])
 
 
+def _keyset_page(stmt, id_column, before_id: Optional[int], after_id: Optional[int], skip: int, limit: int):
+    """
+    按 ID 游标分页（ID 自增，与创建时间顺序一致）
+
+    使用游标时只扫描游标附近的索引区间，翻页耗时不随表大小增长；
+    after_id 按升序取紧邻游标的一页，由 _sort_desc 翻转回倒序
+    """
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id).order_by(id_column.asc())
+    else:
+        if before_id is not None:
+            stmt = stmt.where(id_column < before_id)
+        stmt = stmt.order_by(id_column.desc())
+    if skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+
+def _sort_desc(rows, after_id: Optional[int]) -> list:
+    """将分页结果统一为倒序"""
+    rows = list(rows)
+    if after_id is not None:
+        rows.reverse()
+    return rows
+
+
 # ==================== 任务 CRUD ====================
 
 @router.post("", response_model=ResponseBase[TaskResponse])
@@ -88,40 +114,34 @@ async def list_tasks(
     status: Optional[TaskStatusEnum] = Query(None, description="任务状态筛选"),
     skip: int = Query(0, ge=0, description="跳过条数"),
     limit: int = Query(20, ge=1, le=100, description="返回条数"),
-    db: AsyncSession = Depends(get_db)
+    before_id: Optional[int] = Query(None, description="游标：返回 ID 小于该值的任务（更早创建）"),
+    after_id: Optional[int] = Query(None, description="游标：返回 ID 大于该值的任务（更晚创建）"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取任务列表"""
-    stmt = select(Task)
-    
+    """获取任务列表（按创建时间倒序，翻页优先使用 before_id 游标）"""
+    filters = []
     if user_id:
-        stmt = stmt.where(Task.user_id == user_id)
-    
+        filters.append(Task.user_id == user_id)
     if status:
-        stmt = stmt.where(Task.status == TaskStatus(status.value))
-    
-    stmt = stmt.order_by(Task.created_at.desc()).offset(skip).limit(limit)
+        filters.append(Task.status == TaskStatus(status.value))
     
+    stmt = _keyset_page(select(Task).where(*filters), Task.id, before_id, after_id, skip, limit)
     result = await db.execute(stmt)
-    tasks = result.scalars().all()
+    tasks = _sort_desc(result.scalars().all(), after_id)
     
     # 获取总数
-    count_stmt = select(Task)
-    if user_id:
-        count_stmt = count_stmt.where(Task.user_id == user_id)
-    if status:
-        count_stmt = count_stmt.where(Task.status == TaskStatus(status.value))
-    
-    count_result = await db.execute(count_stmt)
-    total = len(count_result.scalars().all())
+    count_stmt = select(func.count()).select_from(Task).where(*filters)
+    total = (await db.execute(count_stmt)).scalar_one()
     
     return TaskListResponse(
         total=total,
-        tasks=[TaskResponse.model_validate(t) for t in tasks]
+        tasks=[TaskResponse.model_validate(t) for t in tasks],
+        next_before_id=tasks[-1].id if len(tasks) == limit else None
     )
 
 
 @router.get("/{task_id}", response_model=ResponseBase[TaskResponse])
-async def get_task(task_id: int, db: AsyncSession = Depends(get_db)):
+async def get_task(task_id: int, db: AsyncSession = Depends(get_read_db)):
     """获取任务详情"""
     stmt = select(Task).where(Task.id == task_id)
     result = await db.execute(stmt)
@@ -316,29 +336,32 @@ async def get_task_logs(
     level: Optional[str] = Query(None, description="日志级别筛选"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: AsyncSession = Depends(get_db)
+    before_id: Optional[int] = Query(None, description="游标：返回 ID 小于该值的日志（更早）"),
+    after_id: Optional[int] = Query(None, description="游标：返回 ID 大于该值的日志（更新，用于增量拉取）"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取任务日志"""
+    """获取任务日志（按时间倒序，翻页优先使用 before_id 游标）"""
     # 检查任务是否存在
-    stmt = select(Task).where(Task.id == task_id)
+    stmt = select(Task.id).where(Task.id == task_id)
     result = await db.execute(stmt)
-    task = result.scalar_one_or_none()
     
-    if not task:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="任务不存在")
     
     # 查询日志
-    stmt = select(TaskLog).where(TaskLog.task_id == task_id)
-    
+    filters = [TaskLog.task_id == task_id]
     if level:
-        stmt = stmt.where(TaskLog.level == level)
-    
-    stmt = stmt.order_by(TaskLog.created_at.desc()).offset(skip).limit(limit)
+        filters.append(TaskLog.level == level)
     
+    stmt = _keyset_page(select(TaskLog).where(*filters), TaskLog.id, before_id, after_id, skip, limit)
     result = await db.execute(stmt)
-    logs = result.scalars().all()
+    logs = _sort_desc(result.scalars().all(), after_id)
+    
+    count_stmt = select(func.count()).select_from(TaskLog).where(*filters)
+    total = (await db.execute(count_stmt)).scalar_one()
     
     return TaskLogsResponse(
-        total=len(logs),
-        logs=[TaskLogResponse.model_validate(log) for log in logs]
+        total=total,
+        logs=[TaskLogResponse.model_validate(log) for log in logs],
+        next_before_id=logs[-1].id if len(logs) == limit else None
     )
@@ -6,20 +6,88 @@
 使用 SQLAlchemy 2.0 异步模式
 """
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.schema import CreateColumn
 from typing import AsyncGenerator
 
 from .config import get_settings
 
 settings = get_settings()
 
-# 创建异步引擎
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
-)
+
+# ==================== SQLite 存储配置 ====================
+
+def _is_sqlite_file(url: str) -> bool:
+    """是否为 SQLite 文件数据库（内存库无法拆分读写连接）"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool) -> list:
+    """按存储配置生成连接初始化 PRAGMA"""
+    pragmas = [f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}"]
+    if settings.SQLITE_STORAGE_PROFILE == "tuned":
+        pragmas += [
+            f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}",
+            f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+            f"PRAGMA cache_size = -{settings.SQLITE_CACHE_SIZE_KB}",
+            f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def _apply_sqlite_profile(async_engine: AsyncEngine, read_only: bool = False):
+    """新建连接时应用存储配置"""
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _create_engine(pool_size: int) -> AsyncEngine:
+    options = {"echo": settings.DEBUG, "future": True}
+    if _is_sqlite_file(settings.DATABASE_URL):
+        options.update(pool_size=pool_size, max_overflow=0, pool_timeout=settings.DB_POOL_TIMEOUT)
+    elif is_postgresql():
+        # 多个 API/调度进程共用一个数据库，连接池按进程配置
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    return create_async_engine(settings.DATABASE_URL, **options)
+
+
+def is_postgresql() -> bool:
+    """当前是否使用 PostgreSQL（asyncpg）"""
+    return make_url(settings.DATABASE_URL).get_backend_name() == "postgresql"
+
+
+# 创建异步引擎（写连接）
+engine = _create_engine(settings.SQLITE_WRITE_POOL_SIZE)
+
+# 只读引擎：WAL 模式下读连接不阻塞写入，列表/详情等查询接口使用
+# （PostgreSQL 读写互不阻塞，直接共用同一连接池）
+if _is_sqlite_file(settings.DATABASE_URL):
+    _apply_sqlite_profile(engine)
+    read_engine = _create_engine(settings.SQLITE_READ_POOL_SIZE)
+    _apply_sqlite_profile(read_engine, read_only=True)
+else:
+    read_engine = engine
 
 # 创建异步会话工厂
 AsyncSessionLocal = async_sessionmaker(
@@ -30,6 +98,15 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
 )
 
+# 只读会话工厂
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
 
 class Base(DeclarativeBase):
     """模型基类"""
@@ -49,12 +126,44 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """获取只读数据库会话（依赖注入，用于只查询的接口）"""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def _add_missing_columns(conn):
+    """为已存在的表补充新增的列（新增列需可为空或带 server_default）"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(f"无法自动添加非空且无默认值的列: {table.name}.{column.name}")
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _create_missing_indexes(conn):
+    """为已存在的表补建新增的索引（create_all 不会修改已存在的表）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_db():
     """初始化数据库（创建表）"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
 
 
 async def close_db():
     """关闭数据库连接"""
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP 连接池模块
+
+为访问 kyfw.12306.cn 的服务提供进程级共享的长连接传输层（keep-alive / 可选 HTTP/2），
+并按客户端类型记录请求耗时分布
+"""
+
+import time
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import httpx
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """请求耗时直方图（毫秒）"""
+
+    BUCKETS_MS: List[float] = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        if buckets_ms is not None:
+            self.BUCKETS_MS = buckets_ms
+        self.counts: List[int] = [0] * (len(self.BUCKETS_MS) + 1)
+        self.total: int = 0
+        self.sum_ms: float = 0.0
+        self.max_ms: float = 0.0
+
+    def record(self, elapsed_ms: float):
+        """记录一次请求耗时"""
+        self.counts[bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """按桶上界估算分位数"""
+        if not self.total:
+            return None
+        threshold = self.total * p
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return self.BUCKETS_MS[idx] if idx < len(self.BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        """导出统计数据"""
+        buckets = {f"le_{int(b)}ms": c for b, c in zip(self.BUCKETS_MS, self.counts)}
+        buckets["gt_max"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 2) if self.total else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": buckets,
+        }
+
+
+# 按客户端标签（如 query.pooled / order.direct）统计的耗时直方图
+_histograms: Dict[str, LatencyHistogram] = {}
+
+
+def get_latency_stats() -> Dict[str, dict]:
+    """获取所有客户端的请求耗时统计"""
+    return {label: h.snapshot() for label, h in _histograms.items()}
+
+
+def reset_latency_stats():
+    """清空耗时统计（切换配置前后对比时使用）"""
+    _histograms.clear()
+
+
+def _latency_hooks(label: str) -> Dict[str, list]:
+    """构造记录请求耗时（到响应头返回为止）的事件钩子"""
+
+    async def on_request(request: httpx.Request):
+        request.extensions["start_time"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response):
+        start = response.request.extensions.get("start_time")
+        if start is not None:
+            if label not in _histograms:
+                _histograms[label] = LatencyHistogram()
+            _histograms[label].record((time.perf_counter() - start) * 1000)
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+class _SharedTransport(httpx.AsyncHTTPTransport):
+    """共享传输层：客户端关闭时不关闭底层连接池，由 close_shared_transport 统一释放"""
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        await super().aclose()
+
+
+_shared_transport: Optional[_SharedTransport] = None
+_shared_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """检查是否启用并安装了 HTTP/2 支持（h2 为可选依赖）"""
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("[HTTP] 未安装 h2，HTTP/2 已禁用（pip install httpx[http2]）")
+        return False
+    return True
+
+
+def _build_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_shared_transport() -> _SharedTransport:
+    """获取进程级共享传输层"""
+    global _shared_transport
+    if _shared_transport is None:
+        _shared_transport = _SharedTransport(
+            verify=False,
+            http2=_http2_available(),
+            limits=_build_limits(),
+        )
+    return _shared_transport
+
+
+def create_client(
+    label: str,
+    headers: Optional[dict] = None,
+    timeout: float = 30.0,
+    cookies: Optional[Dict[str, str]] = None,
+) -> httpx.AsyncClient:
+    """
+    创建 12306 客户端
+
+    启用连接池时客户端只持有独立的 cookies，连接复用共享传输层；
+    客户端关闭后连接仍保留在池中供其他客户端使用
+
+    Args:
+        label: 耗时统计标签
+        headers: 默认请求头
+        timeout: 超时时间（秒）
+        cookies: 初始 cookies
+    """
+    if settings.HTTP_POOL_ENABLED:
+        transport = get_shared_transport()
+        label = f"{label}.pooled"
+    else:
+        transport = None
+        label = f"{label}.direct"
+
+    client = httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout,
+        verify=False,
+        follow_redirects=True,
+        transport=transport,
+        event_hooks=_latency_hooks(label),
+    )
+    if cookies:
+        client.cookies.update(cookies)
+    return client
+
+
+def get_shared_client(headers: Optional[dict] = None, timeout: float = 15.0) -> httpx.AsyncClient:
+    """
+    获取进程级共享的匿名客户端（无登录 cookies，如余票查询）
+
+    首次调用时的 headers/timeout 生效，调用方不应关闭该客户端
+    """
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = create_client("anonymous", headers=headers, timeout=timeout)
+    return _shared_client
+
+
+async def close_shared_transport():
+    """关闭共享客户端和连接池（应用退出时调用）"""
+    global _shared_client, _shared_transport
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+    if _shared_transport is not None:
+        await _shared_transport.shutdown()
+        _shared_transport = None
@@ -1,5 +1,6 @@
 # 数据库模型模块
 from .user import User
-from .task import Task, TaskLog
+from .task import Task, TaskLog, OrderSpan
+from .lease import TaskLease
 
-__all__ = ["User", "Task", "TaskLog"]
+__all__ = ["User", "Task", "TaskLog", "OrderSpan", "TaskLease"]
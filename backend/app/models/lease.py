@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务租约模型
+
+独立 worker 进程通过租约认领运行中的任务，定期续约；
+租约过期（worker 退出或失联）后其他 worker 可接管
+"""
+
+from datetime import datetime
+from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..core.database import Base
+
+
+class TaskLease(Base):
+    """任务租约表"""
+    __tablename__ = "task_leases"
+    
+    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    
+    # 持有租约的 worker（主机名:进程号）
+    owner: Mapped[str] = mapped_column(String(200), index=True)
+    
+    # 租约时间
+    acquired_at: Mapped[datetime] = mapped_column(DateTime)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<TaskLease(task_id={self.task_id}, owner={self.owner}, expires_at={self.expires_at})>"
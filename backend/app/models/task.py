@@ -9,7 +9,7 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from enum import Enum as PyEnum
-from sqlalchemy import String, Text, DateTime, Boolean, Integer, ForeignKey, Enum
+from sqlalchemy import String, Text, DateTime, Boolean, Integer, Float, ForeignKey, Enum, Index, true
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..core.database import Base
@@ -59,7 +59,7 @@ class Task(Base):
     query_interval: Mapped[int] = mapped_column(Integer, default=5)    # 刷票间隔（秒）
     max_retry_count: Mapped[int] = mapped_column(Integer, default=100)  # 最大重试次数
     auto_submit: Mapped[bool] = mapped_column(Boolean, default=True)   # 自动提交订单
-    allow_scheduled_start: Mapped[bool] = mapped_column(Boolean, default=True)  # 允许被全局定时启动
+    allow_scheduled_start: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true())  # 允许被全局定时启动
     
     # 状态
     status: Mapped[TaskStatus] = mapped_column(
@@ -81,6 +81,11 @@ class Task(Base):
     # 关联日志
     logs = relationship("TaskLog", back_populates="task", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # 任务列表按用户/状态筛选并按 ID 倒序分页
+        Index("ix_tasks_user_status_id", "user_id", "status", "id"),
+    )
+    
     def __repr__(self) -> str:
         return f"<Task(id={self.id}, name={self.name}, status={self.status})>"
 
@@ -101,11 +106,52 @@ class TaskLog(Base):
     # 详细数据（JSON）
     details: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
-    # 时间戳
+    # 时间戳（合并日志为首次出现时间）
     created_at: Mapped[datetime] = mapped_column(DateTime, default=china_now)
     
+    # 连续重复日志合并：重复次数、最后一次出现时间
+    repeat_count: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    last_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
     # 关联任务
     task = relationship("Task", back_populates="logs")
     
+    __table_args__ = (
+        # 日志按任务（及级别）筛选并按 ID 游标分页
+        Index("ix_task_logs_task_id_id", "task_id", "id"),
+        Index("ix_task_logs_task_level_id", "task_id", "level", "id"),
+    )
+    
     def __repr__(self) -> str:
         return f"<TaskLog(id={self.id}, level={self.level}, message={self.message[:50]})>"
+
+
+class OrderSpan(Base):
+    """
+    下单步骤耗时表
+
+    每次下单尝试的每个步骤一行，用于按步骤统计耗时分位数并对比不同版本/部署；
+    不设外键，任务删除后仍保留历史耗时数据
+    """
+    __tablename__ = "order_spans"
+    
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    task_id: Mapped[int] = mapped_column(Integer, index=True)
+    
+    # 同一次下单尝试的各步骤共享 trace_id
+    trace_id: Mapped[str] = mapped_column(String(32))
+    
+    # 步骤名（submit_order_request、init_dc ... query_order_wait_time）及耗时
+    step: Mapped[str] = mapped_column(String(40))
+    elapsed_ms: Mapped[float] = mapped_column(Float)
+    ok: Mapped[bool] = mapped_column(Boolean, default=True)
+    
+    # 版本与部署标识
+    app_version: Mapped[str] = mapped_column(String(40))
+    deployment: Mapped[str] = mapped_column(String(200))
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=china_now)
+    
+    __table_args__ = (
+        Index("ix_order_spans_step_created", "step", "created_at"),
+    )
@@ -119,6 +119,7 @@ class TaskListResponse(BaseModel):
     """任务列表响应"""
     total: int
     tasks: List[TaskResponse]
+    next_before_id: Optional[int] = None  # 下一页游标（无更多数据时为空）
 
 
 class TaskLogResponse(BaseModel):
@@ -129,6 +130,8 @@ class TaskLogResponse(BaseModel):
     message: str
     details: Optional[str]
     created_at: datetime
+    repeat_count: int = 1               # 连续重复次数（合并后的日志）
+    last_at: Optional[datetime] = None  # 最后一次出现时间
     
     class Config:
         from_attributes = True
@@ -138,3 +141,4 @@ class TaskLogsResponse(BaseModel):
     """任务日志列表响应"""
     total: int
     logs: List[TaskLogResponse]
+    next_before_id: Optional[int] = None  # 下一页游标（无更多数据时为空）
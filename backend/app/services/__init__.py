@@ -2,5 +2,6 @@
 from .login_service import LoginService
 from .query_service import QueryService
 from .order_service import OrderService
+from .order_session import OrderSessionPool, get_order_session_pool
 
-__all__ = ["LoginService", "QueryService", "OrderService"]
+__all__ = ["LoginService", "QueryService", "OrderService", "OrderSessionPool", "get_order_session_pool"]
@@ -12,10 +12,11 @@ import time
 import asyncio
 import urllib.parse
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Callable, Set, Tuple
 from datetime import datetime
 import httpx
 
+from ..core.http import create_client
 from .query_service import TrainInfo
 
 
@@ -86,6 +87,22 @@ class OrderResult:
     message: str = ""
     wait_time: int = -1
     wait_count: int = 0
+    step: str = ""  # 失败所在步骤（如 check_order_info）
+    unknown: bool = False  # 结果未知：订单可能已在 12306 排队，不能按失败处理
+    step_times: Dict[str, float] = field(default_factory=dict)  # 各步骤耗时（毫秒）
+
+
+# 超出预算后仍在后台进行的确认订单请求（保留引用，避免被回收）
+_pending_confirms: Set[asyncio.Task] = set()
+
+
+class OrderStepTimeout(Exception):
+    """下单步骤超出时间预算"""
+
+    def __init__(self, step: str, budget: float):
+        super().__init__(f"{step} 超时")
+        self.step = step
+        self.budget = budget
 
 
 class OrderService:
@@ -102,6 +119,23 @@ class OrderService:
     CONFIRM_ORDER_URL = f"{BASE_URL}/otn/confirmPassenger/confirmSingleForQueue"
     QUERY_ORDER_URL = f"{BASE_URL}/otn/confirmPassenger/queryOrderWaitTime"
     
+    # 出票结果轮询
+    DEFAULT_ORDER_WAIT = 60.0   # 调用方未指定截止时间时的最长等待（秒）
+    POLL_MIN_INTERVAL = 0.5     # 最短查询间隔（秒）
+    POLL_MAX_INTERVAL = 5.0     # 最长查询间隔（秒）
+    POLL_PER_QUEUED = 0.1       # 仅有排队人数时，每位排队者增加的间隔（秒）
+    
+    # 下单各步骤的时间上限（秒），不超过整体剩余时间
+    STEP_BUDGETS = {
+        "submit_order_request": 5.0,
+        "init_dc": 5.0,
+        "get_passengers": 5.0,
+        "check_order_info": 5.0,
+        "get_queue_count": 3.0,
+        "confirm_order": 8.0,
+    }
+    DEFAULT_STEP_BUDGET = 5.0
+    
     HEADERS = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'application/json, text/javascript, */*; q=0.01',
@@ -113,29 +147,29 @@ class OrderService:
         'X-Requested-With': 'XMLHttpRequest',
     }
     
-    def __init__(self, cookies: Dict[str, str] = None):
+    def __init__(self, cookies: Dict[str, str] = None, client: Optional[httpx.AsyncClient] = None):
         """
         初始化订单服务
         
         Args:
             cookies: 登录后的 cookies
+            client: 外部持有的长连接客户端（如下单会话池），传入时 close() 不会关闭它
         """
         self._cookies = cookies or {}
-        self._client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[httpx.AsyncClient] = client
+        self._owns_client = client is None
         self._order_token: Optional[OrderToken] = None
         self._passengers: List[Passenger] = []
     
     async def get_client(self) -> httpx.AsyncClient:
         """获取异步 HTTP 客户端"""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
+            self._client = create_client(
+                "order",
                 headers=self.HEADERS,
                 timeout=30.0,
-                verify=False,
-                follow_redirects=True
+                cookies=self._cookies
             )
-            if self._cookies:
-                self._client.cookies.update(self._cookies)
         return self._client
     
     def set_cookies(self, cookies: Dict[str, str]):
@@ -145,10 +179,10 @@ class OrderService:
             self._client.cookies.update(cookies)
     
     async def close(self):
-        """关闭连接"""
-        if self._client:
+        """关闭连接（外部传入的客户端由其持有者负责关闭）"""
+        if self._client and self._owns_client:
             await self._client.aclose()
-            self._client = None
+        self._client = None
     
     # ==================== 0. 常用数据获取 ====================
 
@@ -424,10 +458,15 @@ class OrderService:
     
     # ==================== 5. 获取排队信息 ====================
     
-    async def get_queue_count(self, seat_type: str = "O") -> Tuple[bool, int, int, str]:
-        """获取排队信息"""
+    async def get_queue_count(self, seat_type: str = "O") -> Tuple[bool, Optional[int], Optional[int], str]:
+        """
+        获取排队信息
+
+        Returns:
+            (是否成功, 余票数, 排队人数, 错误信息)，无法解析的数量为 None
+        """
         if not self._order_token:
-            return False, 0, 0, "请先调用 init_dc()"
+            return False, None, None, "请先调用 init_dc()"
         
         client = await self.get_client()
         
@@ -460,20 +499,41 @@ class OrderService:
             result = response.json()
             
             if result.get("status") and result.get("data"):
-                data_info = result["data"]
-                
-                ticket_str = data_info.get("ticket", "0,0")
-                tickets = ticket_str.split(",")
-                ticket_count = int(tickets[0]) if tickets[0].isdigit() else 0
-                queue_count = int(data_info.get("countT", 0))
-                
+                ticket_count, queue_count = self.parse_queue_count(result["data"])
                 return True, ticket_count, queue_count, ""
             else:
                 messages = result.get("messages", ["获取失败"])
-                return False, 0, 0, messages[0] if messages else "获取失败"
+                return False, None, None, messages[0] if messages else "获取失败"
                 
         except Exception as e:
-            return False, 0, 0, str(e)
+            return False, None, None, str(e)
+    
+    @staticmethod
+    def parse_queue_count(data_info: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        解析 getQueueCount 返回的余票数与排队人数
+
+        ticket 形如 "余票数,无座余票数"，countT 为排队人数；缺失或格式无法识别时返回 None
+        """
+        def to_int(value: Any) -> Optional[int]:
+            value = str(value).strip() if value is not None else ""
+            return int(value) if value.isdigit() else None
+
+        ticket_str = data_info.get("ticket")
+        ticket_count = to_int(ticket_str.split(",")[0]) if isinstance(ticket_str, str) else to_int(ticket_str)
+        return ticket_count, to_int(data_info.get("countT"))
+    
+    @staticmethod
+    def queue_exceeds_tickets(ticket_count: Optional[int], queue_count: Optional[int], ratio: float) -> bool:
+        """
+        余票明确为 0，或排队人数超过余票数的 ratio 倍时判定为排不上；
+        数量未知（None）时不做判断，继续下单
+        """
+        if ticket_count is None:
+            return False
+        if ticket_count == 0:
+            return True
+        return queue_count is not None and queue_count > ticket_count * ratio
     
     # ==================== 6. 确认订单 ====================
     
@@ -530,15 +590,39 @@ class OrderService:
     
     # ==================== 7. 查询订单结果 ====================
     
-    async def query_order_wait_time(self, max_wait: int = 60) -> OrderResult:
-        """轮询查询订单结果"""
+    def _next_poll_delay(self, wait_time: int, wait_count: int) -> float:
+        """
+        根据排队预估决定下次查询间隔
+
+        waitTime 为 12306 预估的剩余出票秒数：临近出票时快速查询，排队较长时放慢，
+        未给出预估（如 -4 处理中、-100 排队中）时按排队人数决定
+        """
+        if wait_time > 0:
+            delay = wait_time / 2
+        elif wait_count > 0:
+            delay = wait_count * self.POLL_PER_QUEUED
+        else:
+            delay = self.POLL_MIN_INTERVAL
+        return min(max(delay, self.POLL_MIN_INTERVAL), self.POLL_MAX_INTERVAL)
+
+    async def query_order_wait_time(self, deadline: Optional[float] = None) -> OrderResult:
+        """
+        轮询查询订单结果
+
+        Args:
+            deadline: 截止时间（time.monotonic() 时间点），由调用方决定整体等待时长，
+                默认 DEFAULT_ORDER_WAIT 秒后
+        """
         if not self._order_token:
             return OrderResult(success=False, message="请先调用 init_dc()")
         
         client = await self.get_client()
-        start_time = time.time()
+        if deadline is None:
+            deadline = time.monotonic() + self.DEFAULT_ORDER_WAIT
+        wait_time, wait_count = -1, 0
         
-        while time.time() - start_time < max_wait:
+        while True:
+            delay = self.POLL_MIN_INTERVAL
             try:
                 params = {
                     "random": str(int(time.time() * 1000)),
@@ -553,19 +637,28 @@ class OrderService:
                 if result.get("status") and result.get("data"):
                     data = result["data"]
                     
-                    wait_time = data.get("waitTime", -1)
+                    wait_time = int(data.get("waitTime", -1))
+                    wait_count = int(data.get("waitCount", 0) or 0)
                     order_id = data.get("orderId", "")
                     
                     if order_id:
                         return OrderResult(
                             success=True,
                             order_id=order_id,
-                            message="出票成功"
+                            message="出票成功",
+                            wait_time=wait_time,
+                            wait_count=wait_count
                         )
                     
-                    if wait_time == -1:
+                    # -1 已结束但无订单号，-2 出票失败，-3 订单已撤销
+                    if wait_time in (-1, -2, -3):
                         error_msg = data.get("msg", "出票失败")
-                        return OrderResult(success=False, message=error_msg)
+                        return OrderResult(
+                            success=False, message=error_msg,
+                            wait_time=wait_time, wait_count=wait_count
+                        )
+                    
+                    delay = self._next_poll_delay(wait_time, wait_count)
                     
                 else:
                     messages = result.get("messages", [])
@@ -575,12 +668,39 @@ class OrderService:
             except Exception:
                 pass
             
-            await asyncio.sleep(1)
-        
-        return OrderResult(success=False, message="等待超时")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # 不越过截止时间，截止前再查询最后一次
+            await asyncio.sleep(min(delay, remaining))
+        
+        # 截止前未查到结果，订单可能仍在排队
+        return OrderResult(
+            success=False, message="等待出票超时，结果未知",
+            wait_time=wait_time, wait_count=wait_count, unknown=True
+        )
     
     # ==================== 完整购票流程 ====================
     
+    async def _step(self, step: str, coro, deadline: float, step_times: Dict[str, float]):
+        """
+        在步骤预算内执行一个下单步骤
+
+        预算取该步骤上限与整体剩余时间中的较小者，用尽时抛出 OrderStepTimeout；
+        无论成败都记录该步骤耗时（毫秒）
+        """
+        budget = min(self.STEP_BUDGETS.get(step, self.DEFAULT_STEP_BUDGET), deadline - time.monotonic())
+        start = time.monotonic()
+        try:
+            if budget <= 0:
+                coro.close()
+                raise OrderStepTimeout(step, 0)
+            return await asyncio.wait_for(coro, timeout=budget)
+        except asyncio.TimeoutError:
+            raise OrderStepTimeout(step, budget)
+        finally:
+            step_times[step] = round((time.monotonic() - start) * 1000, 1)
+    
     async def buy_ticket(
         self,
         train_info: TrainInfo,
@@ -588,7 +708,10 @@ class OrderService:
         passengers: List[Passenger] = None,
         passenger_indices: List[int] = None,
         seat_type: str = "O",
-        choose_seats: str = ""
+        choose_seats: str = "",
+        deadline: Optional[float] = None,
+        queue_ratio: Optional[float] = None,
+        on_confirm: Optional[Callable[[], None]] = None
     ) -> OrderResult:
         """
         完整购票流程
@@ -601,22 +724,60 @@ class OrderService:
             seat_type: 席别代码
             ticket_type: 票种代码 (已废弃，使用 passenger.ticket_type)
             choose_seats: 选座
+            deadline: 整个下单流程的截止时间（time.monotonic() 时间点），默认 DEFAULT_ORDER_WAIT 秒后；
+                各步骤按 STEP_BUDGETS 分配预算，等待出票结果使用剩余全部时间；
+                确认订单超出预算时不取消请求，截止前仍未查到结果则返回 unknown=True 的结果
+            queue_ratio: 排队人数超过余票数的该倍数（或余票为 0）时放弃确认订单，None 表示不检查
+            on_confirm: 即将发出确认订单请求时调用；此后订单可能已在 12306 排队，调用方不应再中断流程
         """
+        if deadline is None:
+            deadline = time.monotonic() + self.DEFAULT_ORDER_WAIT
+        step_times: Dict[str, float] = {}
+        try:
+            result = await self._buy_ticket_steps(
+                train_info, secret_str, passengers, passenger_indices,
+                seat_type, choose_seats, deadline, queue_ratio, on_confirm, step_times
+            )
+        except OrderStepTimeout as e:
+            result = OrderResult(
+                success=False,
+                message=f"{e.step} 超时（预算 {e.budget:.1f} 秒）",
+                step=e.step
+            )
+        result.step_times = step_times
+        return result
+    
+    async def _buy_ticket_steps(
+        self,
+        train_info: TrainInfo,
+        secret_str: str,
+        passengers: Optional[List[Passenger]],
+        passenger_indices: Optional[List[int]],
+        seat_type: str,
+        choose_seats: str,
+        deadline: float,
+        queue_ratio: Optional[float],
+        on_confirm: Optional[Callable[[], None]],
+        step_times: Dict[str, float]
+    ) -> OrderResult:
+        """按顺序执行下单步骤"""
         # 1. 提交订单请求
-        success, error = await self.submit_order_request(train_info, secret_str)
+        success, error = await self._step(
+            "submit_order_request", self.submit_order_request(train_info, secret_str), deadline, step_times
+        )
         if not success:
-            return OrderResult(success=False, message=f"提交订单失败: {error}")
+            return OrderResult(success=False, message=f"提交订单失败: {error}", step="submit_order_request")
         
         # 2. 初始化订单页面
-        success, error = await self.init_dc()
+        success, error = await self._step("init_dc", self.init_dc(), deadline, step_times)
         if not success:
-            return OrderResult(success=False, message=f"初始化订单失败: {error}")
+            return OrderResult(success=False, message=f"初始化订单失败: {error}", step="init_dc")
         
         # 3. 获取乘车人
         if passengers is None:
-            all_passengers, error = await self.get_passengers()
+            all_passengers, error = await self._step("get_passengers", self.get_passengers(), deadline, step_times)
             if not all_passengers:
-                return OrderResult(success=False, message=f"获取乘车人失败: {error}")
+                return OrderResult(success=False, message=f"获取乘车人失败: {error}", step="get_passengers")
             
             if passenger_indices:
                 passengers = [all_passengers[i] for i in passenger_indices if i < len(all_passengers)]
@@ -627,20 +788,58 @@ class OrderService:
             return OrderResult(success=False, message="未选择乘车人")
         
         # 4. 校验订单
-        success, error = await self.check_order_info(passengers, seat_type)
+        success, error = await self._step(
+            "check_order_info", self.check_order_info(passengers, seat_type), deadline, step_times
+        )
         if not success:
-            return OrderResult(success=False, message=f"订单校验失败: {error}")
+            return OrderResult(success=False, message=f"订单校验失败: {error}", step="check_order_info")
         
-        # 5. 获取排队信息
-        await self.get_queue_count(seat_type)
-        
-        # 6. 确认订单
-        success, error = await self.confirm_order(passengers, seat_type, choose_seats)
-        if not success:
-            return OrderResult(success=False, message=f"确认订单失败: {error}")
+        # 5. 获取排队信息，排队已超出余票时放弃，避免提交后长时间等待失败结果
+        success, ticket_count, queue_count, _ = await self._step(
+            "get_queue_count", self.get_queue_count(seat_type), deadline, step_times
+        )
+        if success and queue_ratio is not None and self.queue_exceeds_tickets(
+            ticket_count, queue_count, queue_ratio
+        ):
+            return OrderResult(
+                success=False,
+                message=f"排队人数过多，放弃下单（余票 {ticket_count}，排队 {'未知' if queue_count is None else queue_count}）",
+                wait_count=queue_count or 0,
+                step="get_queue_count"
+            )
         
-        # 7. 等待出票结果
-        return await self.query_order_wait_time()
+        # 6. 确认订单：该请求会在 12306 创建排队订单，超出预算时不取消，直接转入查询出票结果
+        if on_confirm is not None:
+            on_confirm()
+        confirm = asyncio.ensure_future(self.confirm_order(passengers, seat_type, choose_seats))
+        _pending_confirms.add(confirm)
+        confirm.add_done_callback(_pending_confirms.discard)
+        budget = min(self.STEP_BUDGETS["confirm_order"], deadline - time.monotonic())
+        start = time.monotonic()
+        await asyncio.wait({confirm}, timeout=max(budget, 0))
+        step_times["confirm_order"] = round((time.monotonic() - start) * 1000, 1)
+        if confirm.done():
+            success, error = confirm.result()
+            if not success:
+                return OrderResult(success=False, message=f"确认订单失败: {error}", step="confirm_order")
+        
+        # 7. 等待出票结果（自行在截止时间前结束轮询）
+        start = time.monotonic()
+        result = await self.query_order_wait_time(deadline=deadline)
+        step_times["query_order_wait_time"] = round((time.monotonic() - start) * 1000, 1)
+        if result.success:
+            return result
+        
+        result.step = "query_order_wait_time"
+        if confirm.done():
+            success, error = confirm.result()
+            if not success:
+                return OrderResult(success=False, message=f"确认订单失败: {error}", step="confirm_order")
+        else:
+            # 确认请求仍未返回，查询结果不能说明订单未创建
+            result.unknown = True
+            result.message = f"确认订单未在 {budget:.1f} 秒内返回，出票结果未知"
+        return result
 
 
 # 席别代码映射
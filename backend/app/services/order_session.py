@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+下单会话池
+
+为每个已登录账号维护一个长期存活、预先建连的下单客户端（含 cookies），
+后台定期保活，使发现余票后的第一个下单请求复用已建立的连接；
+同时缓存账号的乘车人列表（含 allEncStr），下单时无需再查询乘车人
+
+会话按使用计数管理：通过 acquire()/release() 成对使用，被替换（cookies 变化）或移除的会话
+在最后一个使用者释放后才关闭，不影响同一账号其他任务正在进行的下单
+"""
+
+import time
+import asyncio
+import logging
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from ..core.config import get_settings
+from ..core.http import create_client
+from .order_service import OrderService, Passenger
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class OrderSession:
+    """单个账号的下单会话"""
+
+    # 轻量保活接口（同时可反映登录状态）
+    KEEPALIVE_URL = f"{OrderService.BASE_URL}/otn/login/conf"
+
+    def __init__(self, user_id: int, cookies: Dict[str, str]):
+        self.user_id = user_id
+        self.cookies = dict(cookies)
+        self.client: httpx.AsyncClient = create_client(
+            "order",
+            headers=OrderService.HEADERS,
+            timeout=30.0,
+            cookies=cookies
+        )
+        self.last_used: float = time.monotonic()
+        self.last_warmed: float = 0.0
+        
+        # 使用计数：正在使用本会话的调用方（刷票节拍、后台刷新）数量
+        self._users: int = 0
+        # 已被替换或移除，最后一个使用者释放后关闭
+        self._retired: bool = False
+        
+        # 乘车人缓存
+        self._passengers: List[Passenger] = []
+        self._passengers_fetched_at: float = 0.0
+        self._passengers_lock = asyncio.Lock()
+
+    def new_order_service(self) -> OrderService:
+        """创建绑定本会话客户端的订单服务（每次下单独立的订单状态）"""
+        self.last_used = time.monotonic()
+        return OrderService(self.cookies, client=self.client)
+
+    async def warm(self) -> bool:
+        """发送保活请求，确保连接已建立"""
+        try:
+            await self.client.post(self.KEEPALIVE_URL, data={"_json_att": ""})
+            self.last_warmed = time.monotonic()
+            return True
+        except Exception as e:
+            logger.debug(f"[下单会话] 用户 {self.user_id} 保活失败: {e}")
+            return False
+
+    def _passengers_age(self) -> float:
+        if not self._passengers_fetched_at:
+            return float("inf")
+        return time.monotonic() - self._passengers_fetched_at
+
+    async def get_passengers(self, force: bool = False) -> Tuple[bool, List[Passenger], str]:
+        """
+        获取乘车人列表（优先使用缓存）
+
+        返回的是副本，调用方可修改 ticket_type 等字段而不影响缓存
+
+        Args:
+            force: 忽略缓存强制从 12306 获取
+        """
+        async with self._passengers_lock:
+            if force or self._passengers_age() >= settings.PASSENGER_CACHE_TTL:
+                order_service = OrderService(self.cookies, client=self.client)
+                success, passengers, error = await order_service.query_passengers()
+                if not success:
+                    return False, [], error
+                self._passengers = passengers
+                self._passengers_fetched_at = time.monotonic()
+                self.last_warmed = self._passengers_fetched_at
+            return True, [replace(p) for p in self._passengers], ""
+
+    def invalidate_passengers(self):
+        """使乘车人缓存失效（如 checkOrderInfo 拒绝乘车人信息时），下次获取时重新查询"""
+        self._passengers_fetched_at = 0.0
+
+    async def refresh(self):
+        """后台刷新：乘车人缓存即将过期时刷新缓存（同时起到保活作用），否则仅保活"""
+        if self._passengers_age() >= settings.PASSENGER_CACHE_TTL * 0.8:
+            success, _, error = await self.get_passengers(force=True)
+            if not success:
+                logger.debug(f"[下单会话] 用户 {self.user_id} 刷新乘车人失败: {error}")
+            return
+        await self.warm()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class OrderSessionPool:
+    """下单会话池（单例）"""
+
+    _instance: Optional["OrderSessionPool"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._sessions = {}
+            cls._instance._refresh_task = None
+            # 新会话的首次预热任务
+            cls._instance._warmups = set()
+        return cls._instance
+
+    async def acquire(self, user_id: int, cookies: Dict[str, str]) -> OrderSession:
+        """
+        获取并占用账号的下单会话，用完后必须调用 release()
+
+        cookies 变化（如重新登录）时重建会话；新会话在后台立即预热并拉取乘车人，
+        旧会话在其所有使用者释放后关闭
+        """
+        session: Optional[OrderSession] = self._sessions.get(user_id)
+        if session is not None and session.cookies == cookies and not session.client.is_closed:
+            session.last_used = time.monotonic()
+            session._users += 1
+            return session
+
+        old_session = session
+        session = OrderSession(user_id, cookies)
+        # 调用方与预热任务各占用一次
+        session._users += 2
+        self._sessions[user_id] = session
+
+        warmup = asyncio.create_task(self._refresh(session))
+        self._warmups.add(warmup)
+        warmup.add_done_callback(self._on_warmup_done)
+
+        if old_session is not None:
+            await self._retire(old_session)
+        return session
+
+    async def release(self, session: OrderSession):
+        """释放 acquire() 占用的会话；已被替换或移除的会话在最后一个使用者释放后关闭"""
+        session._users -= 1
+        if session._retired and session._users <= 0:
+            await session.close()
+
+    async def _retire(self, session: OrderSession):
+        session._retired = True
+        if session._users <= 0:
+            await session.close()
+
+    async def _refresh(self, session: OrderSession):
+        """后台刷新会话，结束后释放调用方为其占用的计数（占用期间会话被替换也不会关闭）"""
+        try:
+            await session.refresh()
+        finally:
+            await self.release(session)
+
+    def _on_warmup_done(self, task: asyncio.Task):
+        self._warmups.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"[下单会话] 会话预热失败: {task.exception()}")
+
+    async def discard(self, user_id: int):
+        """移除账号会话（如登录失效），正在使用中的会话在释放后关闭"""
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            await self._retire(session)
+
+    def start(self):
+        """启动后台保活循环"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        """定期保活活跃会话并刷新乘车人缓存，清理长时间未使用的会话"""
+        while True:
+            await asyncio.sleep(settings.ORDER_SESSION_REFRESH_INTERVAL)
+            now = time.monotonic()
+            active = []
+            for user_id, session in list(self._sessions.items()):
+                if now - session.last_used > settings.ORDER_SESSION_IDLE_TIMEOUT:
+                    logger.info(f"[下单会话] 用户 {user_id} 会话长时间未使用，已释放")
+                    await self.discard(user_id)
+                else:
+                    active.append(session)
+            if active:
+                for session in active:
+                    session._users += 1
+                results = await asyncio.gather(*(self._refresh(s) for s in active), return_exceptions=True)
+                for session, result in zip(active, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"[下单会话] 用户 {session.user_id} 后台刷新失败: {result}")
+
+    async def close(self):
+        """停止保活并关闭所有会话（服务关闭时调用，不再等待使用者释放）"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        for task in list(self._warmups):
+            task.cancel()
+        if self._warmups:
+            await asyncio.gather(*self._warmups, return_exceptions=True)
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+
+def get_order_session_pool() -> OrderSessionPool:
+    """获取下单会话池实例"""
+    return OrderSessionPool()
@@ -8,14 +8,18 @@
 
 import re
 import json
+import time
 import asyncio
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import httpx
 
 from ..core.config import get_settings
+from .station_index import StationIndex
+from ..core.http import create_client, get_shared_client
 
 settings = get_settings()
 
@@ -77,6 +81,8 @@ class StationManager:
     _stations: Dict[str, Station] = {}
     _code_to_name: Dict[str, str] = {}
     _name_to_code: Dict[str, str] = {}
+    _station_list: List[Station] = []          # 按热度（文件顺序）排列，下标即索引中的站点序号
+    _index: Optional[StationIndex] = None
     _loaded: bool = False
     
     def __new__(cls):
@@ -93,6 +99,7 @@ class StationManager:
             with open(filepath, 'r', encoding='utf-8') as f:
                 content = f.read()
             self._parse_stations(content)
+            self._build_index()
             StationManager._loaded = True
             return True
         except Exception as e:
@@ -135,6 +142,12 @@ class StationManager:
                 except Exception:
                     continue
     
+    def _build_index(self):
+        """建立站名/拼音/简拼搜索索引"""
+        stations = list(StationManager._stations.values())
+        StationManager._station_list = stations
+        StationManager._index = StationIndex([(s.name, s.pinyin, s.short_pinyin) for s in stations])
+    
     def get_station_code(self, name: str) -> Optional[str]:
         """根据站名获取电报码"""
         return StationManager._name_to_code.get(name)
@@ -144,25 +157,135 @@ class StationManager:
         return StationManager._code_to_name.get(code)
     
     def search_station(self, keyword: str, limit: int = 20) -> List[Station]:
-        """搜索站点"""
-        results = []
-        keyword = keyword.lower()
-        
-        for name, station in StationManager._stations.items():
-            if (keyword in name.lower() or 
-                keyword in station.pinyin.lower() or
-                keyword in station.short_pinyin.lower()):
-                results.append(station)
-                if len(results) >= limit:
-                    break
+        """
+        搜索站点（站名、拼音、简拼）
         
-        return results
+        精确匹配优先，其次前缀匹配、子串匹配，同类按热度排序
+        """
+        if StationManager._index is None:
+            return []
+        stations = StationManager._station_list
+        return [stations[sid] for sid in StationManager._index.search(keyword, limit)]
     
     def get_all_stations(self) -> List[Station]:
         """获取所有站点"""
         return list(StationManager._stations.values())
 
 
+RouteKey = Tuple[str, str, str, str]
+
+
+class QueryBroker:
+    """
+    查票请求合并器（单例）
+
+    同一线路 (出发站代码, 到达站代码, 出发日期, 票种) 的并发查询只向 12306 发起一次请求，
+    其余调用方加入正在进行的请求并共享解析后的车次列表。
+    成功的结果按线路缓存 QUERY_CACHE_TTL 秒（LRU 淘汰），供查票接口和刷票任务复用
+    """
+
+    _instance: Optional["QueryBroker"] = None
+    _inflight: Dict[RouteKey, "asyncio.Future"] = {}
+    _cache: "OrderedDict[RouteKey, Tuple[float, List[TrainInfo]]]" = OrderedDict()
+    _stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def _get_cached(self, key: RouteKey) -> Optional[List[TrainInfo]]:
+        """读取未过期的缓存结果"""
+        entry = QueryBroker._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, trains = entry
+        if time.monotonic() >= expires_at:
+            del QueryBroker._cache[key]
+            return None
+        QueryBroker._cache.move_to_end(key)
+        return trains
+
+    def _put_cached(self, key: RouteKey, trains: List[TrainInfo]):
+        """写入缓存并按 LRU 淘汰超出上限的线路"""
+        ttl = settings.QUERY_CACHE_TTL
+        if ttl <= 0:
+            return
+        QueryBroker._cache[key] = (time.monotonic() + ttl, trains)
+        QueryBroker._cache.move_to_end(key)
+        while len(QueryBroker._cache) > settings.QUERY_CACHE_MAX_ROUTES:
+            QueryBroker._cache.popitem(last=False)
+            QueryBroker._stats["evictions"] += 1
+
+    def invalidate(self, key: Optional[RouteKey] = None):
+        """清除指定线路（或全部）的缓存"""
+        if key is None:
+            QueryBroker._cache.clear()
+        else:
+            QueryBroker._cache.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        stats = dict(QueryBroker._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        stats["size"] = len(QueryBroker._cache)
+        stats["inflight"] = len(QueryBroker._inflight)
+        stats["ttl"] = settings.QUERY_CACHE_TTL
+        stats["max_routes"] = settings.QUERY_CACHE_MAX_ROUTES
+        return stats
+
+    async def fetch(
+        self,
+        key: RouteKey,
+        fetcher: Callable[[], Awaitable[Tuple[List[TrainInfo], str]]]
+    ) -> Tuple[List[TrainInfo], str]:
+        """
+        获取线路查询结果
+
+        Args:
+            key: 线路键
+            fetcher: 实际发起查询的协程工厂（仅在无进行中请求时调用）
+
+        Returns:
+            (trains, error_message)
+        """
+        cached = self._get_cached(key)
+        if cached is not None:
+            QueryBroker._stats["hits"] += 1
+            return cached, ""
+
+        future = QueryBroker._inflight.get(key)
+        if future is not None:
+            QueryBroker._stats["coalesced"] += 1
+        else:
+            QueryBroker._stats["misses"] += 1
+            future = asyncio.ensure_future(fetcher())
+            QueryBroker._inflight[key] = future
+            future.add_done_callback(lambda f: self._on_done(key, f))
+
+        # shield: 单个调用方被取消时不影响共享请求和其他等待者
+        return await asyncio.shield(future)
+
+    def _on_done(self, key: RouteKey, future: "asyncio.Future"):
+        """请求完成后移出进行中列表"""
+        if QueryBroker._inflight.get(key) is future:
+            del QueryBroker._inflight[key]
+        if future.cancelled():
+            return
+        # 读取异常同时将其标记为已处理，避免所有等待者均被取消时产生未处理异常警告
+        if future.exception() is not None:
+            return
+        trains, error = future.result()
+        if not error:
+            self._put_cached(key, trains)
+
+
+def get_query_broker() -> QueryBroker:
+    """获取查票合并器实例"""
+    return QueryBroker()
+
+
 class QueryService:
     """查票服务"""
     
@@ -177,6 +300,13 @@ class QueryService:
         "X-Requested-With": "XMLHttpRequest",
     }
     
+    DEFAULT_QUERY_URL = "leftTicket/queryG"
+    
+    # 查询接口地址（进程内共享并持久化，仅在上游返回重定向/非 JSON/错误状态时重新获取）
+    _shared_query_url: Optional[str] = None
+    _query_url_loaded: bool = False
+    _query_url_lock: Optional[asyncio.Lock] = None
+    
     def __init__(self, cookies: Dict[str, str] = None):
         """
         初始化查票服务
@@ -186,7 +316,6 @@ class QueryService:
         """
         self._cookies = cookies or {}
         self._client: Optional[httpx.AsyncClient] = None
-        self._query_url: Optional[str] = None
         
         # 初始化车站管理器
         self.station_manager = StationManager()
@@ -195,44 +324,92 @@ class QueryService:
             self.station_manager.load_from_file(str(station_file))
     
     async def get_client(self) -> httpx.AsyncClient:
-        """获取异步 HTTP 客户端"""
+        """
+        获取异步 HTTP 客户端
+        
+        未携带 cookies 的匿名查询使用进程级共享客户端，跨任务复用长连接
+        """
+        if not self._cookies:
+            return get_shared_client(headers=self.HEADERS, timeout=15.0)
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
+            self._client = create_client(
+                "query",
                 headers=self.HEADERS,
                 timeout=15.0,
-                verify=False,
-                follow_redirects=True
+                cookies=self._cookies
             )
-            if self._cookies:
-                self._client.cookies.update(self._cookies)
         return self._client
     
     async def close(self):
-        """关闭客户端连接"""
+        """关闭客户端连接（共享客户端不关闭）"""
         if self._client:
             await self._client.aclose()
             self._client = None
     
+    @classmethod
+    def _load_query_url(cls) -> Optional[str]:
+        """读取持久化的查询接口地址"""
+        if not cls._query_url_loaded:
+            cls._query_url_loaded = True
+            try:
+                with open(settings.QUERY_URL_FILE, 'r', encoding='utf-8') as f:
+                    cls._shared_query_url = json.load(f).get("query_url") or None
+            except (OSError, ValueError):
+                pass
+        return cls._shared_query_url
+    
+    @classmethod
+    def _save_query_url(cls, query_url: str):
+        """设置并持久化查询接口地址"""
+        cls._shared_query_url = query_url
+        try:
+            path = Path(settings.QUERY_URL_FILE)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(
+                    {"query_url": query_url, "updated_at": datetime.now().isoformat()},
+                    f, ensure_ascii=False
+                )
+        except OSError:
+            pass
+    
     async def _get_query_url(self) -> str:
         """获取实际的查询 URL"""
-        if self._query_url:
-            return self._query_url
+        query_url = self._load_query_url()
+        if query_url:
+            return query_url
+        return await self._discover_query_url(stale=None)
+    
+    async def _discover_query_url(self, stale: Optional[str]) -> str:
+        """
+        从 leftTicket/init 页面重新获取查询 URL
         
-        client = await self.get_client()
+        Args:
+            stale: 已失效的地址；若其他调用方已完成更新则直接复用新地址
+        """
+        if QueryService._query_url_lock is None:
+            QueryService._query_url_lock = asyncio.Lock()
         
-        try:
-            init_url = f"{self.BASE_URL}/otn/leftTicket/init"
-            resp = await client.get(init_url)
+        async with QueryService._query_url_lock:
+            current = QueryService._shared_query_url
+            if current and current != stale:
+                return current
             
-            match = re.search(r"var CLeftTicketUrl\s*=\s*'([^']+)'", resp.text)
-            if match:
-                self._query_url = match.group(1)
-            else:
-                self._query_url = "leftTicket/queryG"
-        except Exception:
-            self._query_url = "leftTicket/queryG"
-        
-        return self._query_url
+            client = await self.get_client()
+            try:
+                init_url = f"{self.BASE_URL}/otn/leftTicket/init"
+                resp = await client.get(init_url)
+                
+                match = re.search(r"var CLeftTicketUrl\s*=\s*'([^']+)'", resp.text)
+                if match:
+                    self._save_query_url(match.group(1))
+                    return match.group(1)
+            except Exception:
+                pass
+            
+            # 获取失败时使用默认地址，但不持久化，下次失败时再重新获取
+            QueryService._shared_query_url = self.DEFAULT_QUERY_URL
+            return self.DEFAULT_QUERY_URL
     
     async def query(
         self,
@@ -281,29 +458,14 @@ class QueryService:
         except ValueError:
             return [], f"日期格式错误: {train_date}"
         
-        # 执行查询
-        client = await self.get_client()
-        query_url = await self._get_query_url()
-        url = f"{self.BASE_URL}/otn/{query_url}"
-        
-        params = {
-            "leftTicketDTO.train_date": train_date,
-            "leftTicketDTO.from_station": from_code,
-            "leftTicketDTO.to_station": to_code,
-            "purpose_codes": ticket_type
-        }
-        
-        try:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-        except httpx.RequestError as e:
-            return [], f"查询请求失败: {e}"
-        except json.JSONDecodeError:
-            return [], "解析响应失败"
-        
-        # 解析结果
-        trains = self._parse_response(data, train_date)
+        # 执行查询（相同线路的并发查询合并为一次请求）
+        key = (from_code, to_code, train_date, ticket_type)
+        trains, error = await get_query_broker().fetch(
+            key,
+            lambda: self._fetch_trains(from_code, to_code, train_date, ticket_type)
+        )
+        if error:
+            return [], error
         
         # 应用筛选条件
         trains = self._filter_trains(
@@ -316,6 +478,59 @@ class QueryService:
         
         return trains, ""
     
+    async def _fetch_trains(
+        self,
+        from_code: str,
+        to_code: str,
+        train_date: str,
+        ticket_type: str
+    ) -> Tuple[List[TrainInfo], str]:
+        """请求 12306 并解析车次列表（不做筛选）"""
+        client = await self.get_client()
+        query_url = await self._get_query_url()
+        
+        params = {
+            "leftTicketDTO.train_date": train_date,
+            "leftTicketDTO.from_station": from_code,
+            "leftTicketDTO.to_station": to_code,
+            "purpose_codes": ticket_type
+        }
+        
+        # 查询地址失效时最多重新获取一次
+        for attempt in range(2):
+            url = f"{self.BASE_URL}/otn/{query_url}"
+            try:
+                resp = await client.get(url, params=params)
+            except httpx.RequestError as e:
+                return [], f"查询请求失败: {e}"
+            
+            # 被重定向或返回错误状态，说明查询地址已变更
+            if resp.history or resp.is_error:
+                if attempt == 0:
+                    query_url = await self._discover_query_url(stale=query_url)
+                    continue
+                return [], f"查询请求失败: HTTP {resp.status_code}"
+            
+            try:
+                data = resp.json()
+            except json.JSONDecodeError:
+                if attempt == 0:
+                    query_url = await self._discover_query_url(stale=query_url)
+                    continue
+                return [], "解析响应失败"
+            
+            # 12306 会在地址过期时直接返回新地址: {"status": false, "c_url": "leftTicket/queryZ"}
+            if not data.get("status") and data.get("c_url"):
+                if attempt == 0:
+                    self._save_query_url(data["c_url"])
+                    query_url = data["c_url"]
+                    continue
+                return [], "查询地址已变更，请稍后重试"
+            
+            return self._parse_response(data, train_date), ""
+        
+        return [], "解析响应失败"
+    
     def _get_station_code(self, station: str) -> Optional[str]:
         """获取站点代码"""
         if len(station) == 3 and station.isupper():
@@ -410,7 +625,8 @@ class QueryService:
         only_has_ticket: bool = False
     ) -> List[TrainInfo]:
         """应用筛选条件"""
-        result = trains
+        # 车次列表可能被多个调用方共享，筛选时不修改原列表
+        result = list(trains)
         
         # 车次类型筛选
         if train_types:
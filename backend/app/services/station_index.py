@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+车站搜索索引
+
+站点加载时对站名、拼音、简拼（统一转小写）建立：
+- 精确匹配表
+- 前缀树：每个节点预先保存该前缀下按热度排序的前若干个站点，补全只需沿关键词走 k 步
+- n-gram 倒排表（单字、双字）：子串匹配只需扫描最短的倒排表并校验
+
+结果排序：精确匹配 > 前缀匹配 > 子串匹配，同类按热度（站点文件中的顺序，靠前为热门站）
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: List[int] = []
+
+
+class StationIndex:
+    """车站搜索索引（构建后只读，可被并发请求共享）"""
+
+    # 每个前缀节点保存的站点数上限（不小于接口允许的最大返回数）
+    MAX_PREFIX_RESULTS = 100
+
+    def __init__(self, keys: Sequence[Tuple[str, ...]]):
+        """
+        Args:
+            keys: 按热度排序的站点检索键，第 i 项为第 i 个站点的 (站名, 拼音, 简拼)
+        """
+        self._keys: List[Tuple[str, ...]] = [tuple(k.lower() for k in item if k) for item in keys]
+        self._exact: Dict[str, Tuple[int, ...]] = {}
+        self._root = _TrieNode()
+        self._grams: Dict[str, Tuple[int, ...]] = {}
+        self._build()
+
+    def _build(self):
+        exact: Dict[str, List[int]] = {}
+        grams: Dict[str, List[int]] = {}
+
+        # 按热度顺序插入，各列表天然有序；同一站点的多个键只记录一次
+        for sid, keys in enumerate(self._keys):
+            for key in keys:
+                ids = exact.setdefault(key, [])
+                if not ids or ids[-1] != sid:
+                    ids.append(sid)
+
+                node = self._root
+                for ch in key:
+                    node = node.children.get(ch) or node.children.setdefault(ch, _TrieNode())
+                    if not node.ids or node.ids[-1] != sid:
+                        node.ids.append(sid)
+
+                for n in (1, 2):
+                    for i in range(len(key) - n + 1):
+                        ids = grams.setdefault(key[i:i + n], [])
+                        if not ids or ids[-1] != sid:
+                            ids.append(sid)
+
+        self._exact = {key: tuple(ids) for key, ids in exact.items()}
+        self._grams = {gram: tuple(ids) for gram, ids in grams.items()}
+
+        # 截断并冻结前缀节点的站点列表
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            node.ids = tuple(node.ids[:self.MAX_PREFIX_RESULTS])
+            stack.extend(node.children.values())
+
+    def _prefix(self, keyword: str) -> Sequence[int]:
+        node: Optional[_TrieNode] = self._root
+        for ch in keyword:
+            node = node.children.get(ch)
+            if node is None:
+                return ()
+        return node.ids
+
+    def _substring(self, keyword: str) -> Iterable[int]:
+        """子串匹配：按热度顺序产出包含关键词的站点"""
+        if len(keyword) == 1:
+            yield from self._grams.get(keyword, ())
+            return
+
+        # 取最短的双字倒排表作为候选，再校验完整子串
+        candidates: Optional[Tuple[int, ...]] = None
+        for i in range(len(keyword) - 1):
+            ids = self._grams.get(keyword[i:i + 2])
+            if not ids:
+                return
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        for sid in candidates:
+            if any(keyword in key for key in self._keys[sid]):
+                yield sid
+
+    def search(self, keyword: str, limit: int = 20) -> List[int]:
+        """
+        搜索站点
+
+        Returns:
+            按排序规则返回的站点序号（即构建时 keys 中的下标）
+        """
+        keyword = keyword.strip().lower()
+        if not keyword or limit <= 0:
+            return []
+
+        results: List[int] = []
+        seen: Set[int] = set()
+        for ids in (self._exact.get(keyword, ()), self._prefix(keyword), self._substring(keyword)):
+            for sid in ids:
+                if sid in seen:
+                    continue
+                seen.add(sid)
+                results.append(sid)
+                if len(results) >= limit:
+                    return results
+        return results
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务租约管理
+
+独立 worker 进程中运行：定期续约已持有的任务，认领无人持有或租约已过期的运行中任务，
+并根据数据库中的任务状态同步本地调度（API 进程只修改任务状态，不直接调度）
+"""
+
+import os
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..models.lease import TaskLease
+from ..models.task import Task, TaskStatus, china_now
+
+if TYPE_CHECKING:
+    from .scheduler import TicketScheduler
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """worker 标识：主机名:进程号"""
+    return settings.WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseManager:
+    """任务租约管理器"""
+
+    def __init__(self, scheduler: "TicketScheduler", worker_id: Optional[str] = None):
+        self._scheduler = scheduler
+        self.worker_id = worker_id or default_worker_id()
+        # 本 worker 持有的任务 -> 任务启动时间（API 重新启动任务时会变化）
+        self._owned: Dict[int, Optional[datetime]] = {}
+        self._wakeup = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._last_config_sync = 0.0
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动续约/认领循环"""
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+            logger.info(f"[租约] worker {self.worker_id} 已启动")
+
+    async def stop(self):
+        """停止循环并释放所有租约，其他 worker 可立即接管"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        if self._owned:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(TaskLease).where(TaskLease.owner == self.worker_id))
+                await db.commit()
+            self._owned.clear()
+
+    def wake(self):
+        """立即执行一次扫描（如全局定时任务刚将任务置为运行中）"""
+        self._wakeup.set()
+
+    def owns(self, task_id: int) -> bool:
+        return task_id in self._owned
+
+    async def release(self, task_id: int):
+        """释放单个任务的租约（任务在本 worker 停止时调用）"""
+        if self._owned.pop(task_id, False) is False:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(TaskLease).where(TaskLease.task_id == task_id, TaskLease.owner == self.worker_id)
+            )
+            await db.commit()
+
+    # ==================== 扫描 ====================
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self.scan()
+                if loop.time() - self._last_config_sync >= settings.WORKER_CONFIG_SYNC_INTERVAL:
+                    self._last_config_sync = loop.time()
+                    await self._scheduler.sync_config()
+            except Exception as e:
+                logger.error(f"[租约] 扫描失败: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.LEASE_SCAN_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def scan(self):
+        """续约、同步已持有任务的状态、认领新任务"""
+        now = china_now()
+        expires_at = now + timedelta(seconds=settings.LEASE_TTL)
+
+        async with AsyncSessionLocal() as db:
+            # 续约
+            renewed = set()
+            if self._owned:
+                result = await db.execute(
+                    update(TaskLease)
+                    .where(TaskLease.owner == self.worker_id, TaskLease.task_id.in_(list(self._owned)))
+                    .values(heartbeat_at=now, expires_at=expires_at)
+                    .returning(TaskLease.task_id)
+                )
+                renewed = set(result.scalars())
+
+            # 运行中任务及其租约
+            result = await db.execute(select(Task).where(Task.status == TaskStatus.RUNNING))
+            running = {task.id: task for task in result.scalars()}
+            result = await db.execute(select(TaskLease.task_id, TaskLease.owner, TaskLease.expires_at))
+            leases = {task_id: (owner, lease_expires) for task_id, owner, lease_expires in result}
+
+            # 清理已结束任务上遗留的过期租约
+            stale = [
+                task_id for task_id, (_, lease_expires) in leases.items()
+                if task_id not in running and lease_expires < now
+            ]
+            if stale:
+                await db.execute(delete(TaskLease).where(TaskLease.task_id.in_(stale)))
+            await db.commit()
+
+        # 同步已持有的任务
+        for task_id in list(self._owned):
+            task = running.get(task_id)
+            if task_id not in renewed:
+                # 租约已被其他 worker 接管（本 worker 曾长时间失联）
+                logger.warning(f"[租约] 任务 {task_id} 的租约已丢失，停止本地调度")
+                self._owned.pop(task_id, None)
+                await self._scheduler.stop_task(task_id)
+            elif task is None:
+                # 任务已在其他进程中暂停/取消
+                await self._scheduler.stop_task(task_id)
+            elif task.started_at != self._owned[task_id]:
+                # 任务被重新启动（重试计数已重置），重新加载状态
+                self._owned[task_id] = task.started_at
+                self._scheduler.reload_task(task)
+
+        # 认领无人持有或租约过期的运行中任务
+        for task_id, task in running.items():
+            if task_id in self._owned:
+                continue
+            if settings.WORKER_MAX_TASKS > 0 and len(self._owned) >= settings.WORKER_MAX_TASKS:
+                break
+            lease = leases.get(task_id)
+            if lease is not None and lease[1] >= now:
+                continue
+            if await self._acquire(task_id, now, expires_at):
+                self._owned[task_id] = task.started_at
+                logger.info(f"[租约] 已认领任务 {task_id}" + (f"（接管自 {lease[0]}）" if lease else ""))
+                await self._scheduler.start_task(task_id)
+
+    async def _acquire(self, task_id: int, now: datetime, expires_at: datetime) -> bool:
+        """认领任务租约：接管已过期的租约或新建租约，并发认领时只有一个 worker 成功"""
+        values = {"owner": self.worker_id, "acquired_at": now, "heartbeat_at": now, "expires_at": expires_at}
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(TaskLease)
+                .where(TaskLease.task_id == task_id, TaskLease.expires_at < now)
+                .values(**values)
+            )
+            if result.rowcount == 1:
+                await db.commit()
+                return True
+            try:
+                db.add(TaskLease(task_id=task_id, **values))
+                await db.commit()
+                return True
+            except IntegrityError:
+                # 其他 worker 已持有
+                await db.rollback()
+                return False
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务日志缓冲写入
+
+所有任务的日志先进入有界队列，由后台协程按条数/时间阈值合并为批量 INSERT 写入，
+避免每次刷票都单独提交事务；error/success 日志会尽快落库
+
+同一任务连续重复的日志（如每次刷票的"第 N 次刷票..."与相同的扫描结果）合并为一行，
+只更新重复次数和最后出现时间
+"""
+
+import re
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..models.task import TaskLog, china_now
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 需要尽快落库且队列满时不丢弃的日志级别
+URGENT_LEVELS = frozenset(("error", "success"))
+
+# 视为等价的日志：仅计数不同的刷票进度
+_RETRY_MESSAGE = re.compile(r"^第 \d+ 次刷票\.\.\.$")
+
+# 一个刷票周期内可交替出现并各自合并的日志种类数（刷票进度 + 扫描结果）
+COMPACT_CYCLE = 2
+
+LogKey = Tuple[str, str, Optional[str]]
+
+
+def compaction_key(level: str, message: str, details: Optional[str]) -> LogKey:
+    """计算日志合并键，键相同的连续日志合并为一行"""
+    if _RETRY_MESSAGE.match(message):
+        message = "第 N 次刷票..."
+    return level, message, details
+
+
+@dataclass
+class _LogRun:
+    """正在合并的日志行"""
+    row: dict                  # 待插入的行（插入后仍保留最新内容）
+    id: Optional[int] = None   # 已写入数据库的行 ID
+
+
+class TaskLogSink:
+    """任务日志缓冲写入器（单例）"""
+
+    _instance: Optional["TaskLogSink"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.TASK_LOG_QUEUE_SIZE)
+        self._wakeup = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        # task_id -> 合并中的日志（按出现顺序）
+        self._runs: Dict[int, "OrderedDict[LogKey, _LogRun]"] = {}
+
+        # 统计
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+        self._failed = 0
+        self._compacted = 0
+
+    # ==================== 写入 ====================
+
+    async def emit(self, task_id: int, level: str, message: str, details: str = None):
+        """
+        提交一条任务日志
+
+        队列已满时：TASK_LOG_OVERFLOW 为 block 或日志为 error/success 级别时等待队列空位，
+        否则丢弃该条日志并计数
+        """
+        record = {
+            "task_id": task_id,
+            "level": level,
+            "message": message,
+            "details": details,
+            "created_at": china_now(),
+            "repeat_count": 1,
+            "last_at": None,
+        }
+        urgent = level in URGENT_LEVELS
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            if settings.TASK_LOG_OVERFLOW != "block" and not urgent:
+                self._dropped += 1
+                return
+            await self._queue.put(record)
+        if urgent or self._queue.qsize() >= settings.TASK_LOG_BATCH_SIZE:
+            self._wakeup.set()
+
+    def end_runs(self, task_id: int):
+        """结束任务的日志合并（任务停止时调用），之后的日志另起新行"""
+        self._runs.pop(task_id, None)
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动后台写入"""
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台写入并写入队列中剩余的日志"""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        while not self._queue.empty():
+            await self._write(self._drain(settings.TASK_LOG_BATCH_SIZE))
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            try:
+                if first["level"] not in URGENT_LEVELS:
+                    await self._wait_for_batch()
+            finally:
+                # 攒批过程中被停止时也写入已取出的日志
+                self._wakeup.clear()
+                batch.extend(self._drain(settings.TASK_LOG_BATCH_SIZE - 1))
+                await self._write(batch)
+
+    async def _wait_for_batch(self):
+        """等待攒够一批、到达时间阈值或出现需要尽快落库的日志"""
+        if self._queue.qsize() + 1 >= settings.TASK_LOG_BATCH_SIZE:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.TASK_LOG_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    def _drain(self, limit: int) -> List[dict]:
+        """取出队列中已有的日志（最多 limit 条）"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def _compact(self, batch: List[dict]) -> Tuple[List[_LogRun], List[_LogRun]]:
+        """
+        将日志并入合并中的行
+
+        Returns:
+            (需要插入的新行, 需要更新重复次数的已有行)
+        """
+        new_runs: List[_LogRun] = []
+        updated: Dict[int, _LogRun] = {}
+        for record in batch:
+            if not settings.TASK_LOG_COMPACT_ENABLED:
+                new_runs.append(_LogRun(row=record))
+                continue
+
+            key = compaction_key(record["level"], record["message"], record["details"])
+            runs = self._runs.setdefault(record["task_id"], OrderedDict())
+            run = runs.get(key)
+            if run is not None:
+                run.row["repeat_count"] += 1
+                run.row["last_at"] = record["created_at"]
+                run.row["message"] = record["message"]
+                if run.id is not None:
+                    updated[id(run)] = run
+                self._compacted += 1
+                continue
+
+            # 出现新的日志种类：超出周期时之前的合并全部结束
+            if len(runs) >= COMPACT_CYCLE:
+                runs.clear()
+            run = _LogRun(row=record)
+            runs[key] = run
+            new_runs.append(run)
+
+        return new_runs, list(updated.values())
+
+    async def _write(self, batch: List[dict]):
+        """批量写入数据库（失败时丢弃该批并记录错误，不影响刷票）"""
+        if not batch:
+            return
+        new_runs, updated = self._compact(batch)
+        try:
+            async with AsyncSessionLocal() as db:
+                if new_runs:
+                    result = await db.execute(
+                        insert(TaskLog).returning(TaskLog.id, sort_by_parameter_order=True),
+                        [run.row for run in new_runs]
+                    )
+                    for run, log_id in zip(new_runs, result.scalars()):
+                        run.id = log_id
+                if updated:
+                    await db.execute(update(TaskLog), [
+                        {
+                            "id": run.id,
+                            "repeat_count": run.row["repeat_count"],
+                            "last_at": run.row["last_at"],
+                            "message": run.row["message"],
+                        }
+                        for run in updated
+                    ])
+                await db.commit()
+            self._written += len(batch)
+            self._batches += 1
+        except Exception as e:
+            self._failed += len(batch)
+            # 合并状态已无法与数据库对应，重新开始
+            self._runs.clear()
+            logger.error(f"[日志] 批量写入 {len(batch)} 条任务日志失败: {e}")
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> dict:
+        """获取写入统计"""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self._written,
+            "batches": self._batches,
+            "avg_batch_size": round(self._written / self._batches, 2) if self._batches else None,
+            "compacted": self._compacted,
+            "dropped": self._dropped,
+            "failed": self._failed,
+        }
+
+
+def get_log_sink() -> TaskLogSink:
+    """获取任务日志写入器实例"""
+    return TaskLogSink()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+异步通知分发
+
+刷票中产生的通知先进入有界队列，由固定数量的后台协程并发推送到各渠道，
+渠道的超时、重试与限速都在后台完成，不阻塞调度循环；
+推送计划（启用的渠道）在通知配置加载时构建一次，之后每条通知直接复用
+
+同一标题的普通通知（如多个任务同时"抢票异常"）在短时间窗口内合并为一条汇总推送；
+抢票成功等紧急通知不合并、不排队、不等待限速，立即推送
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..core.config import get_settings
+from ..utils import notify
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    """待推送的通知"""
+    title: str
+    content: str
+    plan: notify.ChannelPlan
+    urgent: bool = False
+
+
+def build_digest(title: str, contents: List[str]) -> Tuple[str, str]:
+    """将同一标题的多条通知合并为一条汇总，返回 (标题, 内容)"""
+    shown = contents[:settings.NOTIFY_DIGEST_MAX_ITEMS]
+    body = "\n\n──────────\n\n".join(shown)
+    if len(contents) > len(shown):
+        body += f"\n\n……另有 {len(contents) - len(shown)} 条同类通知"
+    return f"{title}（{len(contents)} 条）", body
+
+
+class NotificationDispatcher:
+    """通知分发器（单例）"""
+
+    _instance: Optional["NotificationDispatcher"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.NOTIFY_QUEUE_SIZE)
+        self._workers: List[asyncio.Task] = []
+        self._plan: Optional[notify.ChannelPlan] = None
+        self._config: Optional[Dict] = None
+        # 合并窗口内待推送的通知：标题 -> 内容列表
+        self._pending: Dict[str, List[str]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        # 正在推送的紧急通知
+        self._urgent: Set[asyncio.Task] = set()
+
+        notify.configure_rate_limit(
+            settings.NOTIFY_RATE_PER_MINUTE, settings.NOTIFY_RATE_BURST, settings.NOTIFY_RATE_OVERRIDES
+        )
+
+        # 统计
+        self._sent = 0
+        self._failed = 0
+        self._dropped = 0
+        self._coalesced = 0
+
+    # ==================== 提交 ====================
+
+    def submit(self, title: str, content: str, urgent: bool = False) -> bool:
+        """
+        按当前推送计划提交一条通知（立即返回）
+
+        Args:
+            urgent: 紧急通知（如抢票成功），立即推送，不合并、不等待限速
+
+        Returns:
+            是否已接收；未配置推送渠道或队列已满时返回 False
+        """
+        if not self._plan:
+            return False
+
+        if urgent:
+            task = asyncio.create_task(self._send(Notification(title, content, self._plan, urgent=True)))
+            self._urgent.add(task)
+            task.add_done_callback(self._urgent.discard)
+            return True
+
+        if settings.NOTIFY_COALESCE_WINDOW <= 0:
+            return self._enqueue(Notification(title, content, self._plan))
+
+        contents = self._pending.setdefault(title, [])
+        contents.append(content)
+        if len(contents) == 1:
+            self._flush_handles[title] = asyncio.get_running_loop().call_later(
+                settings.NOTIFY_COALESCE_WINDOW, self._flush, title
+            )
+        return True
+
+    def _flush(self, title: str):
+        """合并窗口结束：将同一标题的通知作为一条（或一条汇总）加入推送队列"""
+        self._flush_handles.pop(title, None)
+        contents = self._pending.pop(title, [])
+        if not contents or not self._plan:
+            return
+        if len(contents) == 1:
+            self._enqueue(Notification(title, contents[0], self._plan))
+            return
+        self._coalesced += len(contents) - 1
+        digest_title, digest_content = build_digest(title, contents)
+        self._enqueue(Notification(digest_title, digest_content, self._plan))
+
+    def _enqueue(self, item: Notification) -> bool:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._dropped += 1
+            logger.warning(f"[通知] 队列已满，丢弃通知: {item.title}")
+            return False
+        return True
+
+    def prepare(self, config: Dict):
+        """
+        通知配置加载后调用：构建推送计划，启用一言时提前填充预取池
+        """
+        if config == self._config:
+            return
+        self._config = dict(config)
+        self._plan = notify.compile_plan(config) if config else None
+        if self._plan and self._plan.hitokoto:
+            notify.prefetch_hitokoto()
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动推送协程"""
+        self._workers = [w for w in self._workers if not w.done()]
+        for _ in range(settings.NOTIFY_WORKERS - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._run()))
+
+    async def stop(self):
+        """
+        立即推送合并窗口中的通知，等待队列推送完毕（最多 NOTIFY_DRAIN_TIMEOUT 秒），然后停止推送协程
+        """
+        for title in list(self._flush_handles):
+            self._flush_handles[title].cancel()
+            self._flush(title)
+        pending = list(self._urgent)
+        if self._workers and not self._queue.empty():
+            pending.append(asyncio.create_task(self._queue.join()))
+        if pending:
+            _, not_done = await asyncio.wait(pending, timeout=settings.NOTIFY_DRAIN_TIMEOUT)
+            if not_done:
+                logger.warning(f"[通知] 关闭时仍有 {self._queue.qsize()} 条通知未推送")
+            for task in not_done:
+                task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await notify.close_clients()
+
+    async def _run(self):
+        while True:
+            item: Notification = await self._queue.get()
+            try:
+                await self._send(item)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, item: Notification):
+        try:
+            results = await notify.send_async(
+                item.title, item.content,
+                timeout=settings.NOTIFY_CHANNEL_TIMEOUT,
+                retries=settings.NOTIFY_CHANNEL_RETRIES,
+                plan=item.plan,
+                urgent=item.urgent
+            )
+            self._sent += sum(1 for ok in results.values() if ok)
+            self._failed += sum(1 for ok in results.values() if not ok)
+        except Exception as e:
+            self._failed += 1
+            logger.error(f"[通知] 推送失败: {e}")
+
+    def get_stats(self) -> dict:
+        """获取推送统计"""
+        return {
+            "queued": self._queue.qsize(),
+            "coalescing": sum(len(c) for c in self._pending.values()),
+            "workers": len(self._workers),
+            "sent": self._sent,
+            "failed": self._failed,
+            "dropped": self._dropped,
+            "coalesced": self._coalesced,
+        }
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    """获取通知分发器"""
+    return NotificationDispatcher()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务执行计划
+
+将任务的筛选条件（车次、车次类型、席别优先级、出发时间范围、乘车人）预先编译为不可变结构，
+任务启动或修改时构建一次，每次刷票直接复用
+"""
+
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Optional, Tuple
+
+from ..models.task import Task
+from ..services.query_service import TrainInfo
+from ..services.order_service import Passenger
+
+
+# 席别代码 -> (席别名称, TrainInfo 余票字段)
+SEAT_COLUMNS = {
+    "9": ("商务座", "business_seat"),
+    "M": ("一等座", "first_seat"),
+    "O": ("二等座", "second_seat"),
+    "4": ("软卧", "soft_sleeper"),
+    "3": ("硬卧", "hard_sleeper"),
+    "1": ("硬座", "hard_seat"),
+}
+
+# 余票字段中表示无票的取值
+NO_TICKET_VALUES = frozenset(("--", "无", "*", ""))
+
+PassengerKey = Tuple[str, str]  # (姓名, 证件号)
+
+
+def _parse_minutes(value: str) -> Optional[int]:
+    """将 HH:MM 转换为分钟数"""
+    try:
+        hour, minute = value.strip().split(":")
+        return int(hour) * 60 + int(minute)
+    except (ValueError, AttributeError):
+        return None
+
+
+def seat_available(seat_count: str) -> bool:
+    """判断余票字段是否表示有票可买"""
+    if seat_count in NO_TICKET_VALUES:
+        return False
+    if seat_count == "有":
+        return True
+    try:
+        return int(seat_count) > 0
+    except ValueError:
+        return False
+
+
+@dataclass(frozen=True)
+class TaskPlan:
+    """任务执行计划（不可变）"""
+    task_id: int
+    from_station: str
+    to_station: str
+    train_date: str
+    auto_submit: bool
+
+    # 指定车次集合（None 表示不限）
+    train_codes: Optional[FrozenSet[str]]
+    # 车次类型首字母集合（None 表示不限）
+    train_types: Optional[FrozenSet[str]]
+    # 按优先级排列的席别: (席别代码, 席别名称, 余票字段)
+    seat_columns: Tuple[Tuple[str, str, str], ...]
+    # 出发时间范围（分钟数，闭区间）
+    start_min: Optional[int]
+    start_max: Optional[int]
+    # 乘车人 (姓名, 证件号) -> 任务指定的乘客类型（None 表示沿用 12306 返回值）
+    passengers: Mapping[PassengerKey, Optional[str]]
+
+    def match_trains(self, trains: List[TrainInfo]) -> Tuple[List[TrainInfo], List[TrainInfo]]:
+        """
+        按车次类型、出发时间和指定车次筛选
+
+        Returns:
+            (按类型和时间筛选后的车次, 其中属于指定车次的车次)
+        """
+        train_types = self.train_types
+        start_min = self.start_min
+        start_max = self.start_max
+        candidates = []
+        for train in trains:
+            if train_types is not None and train.train_code[:1] not in train_types:
+                continue
+            if start_min is not None:
+                minutes = _parse_minutes(train.start_time)
+                if minutes is None or not (start_min <= minutes <= start_max):
+                    continue
+            candidates.append(train)
+
+        if self.train_codes is None:
+            return candidates, candidates
+        return candidates, [t for t in candidates if t.train_code in self.train_codes]
+
+    def match_passengers(self, api_passengers: List[Passenger]) -> List[Passenger]:
+        """从账号乘车人中挑出任务指定的乘车人，并应用任务设置的购票类型"""
+        matched = []
+        for passenger in api_passengers:
+            key = (passenger.passenger_name, passenger.passenger_id_no)
+            if key not in self.passengers:
+                continue
+            # 允许用户指定购票类型（如学生买成人票）
+            ticket_type = self.passengers[key]
+            if ticket_type is not None:
+                passenger.ticket_type = ticket_type
+            matched.append(passenger)
+        return matched
+
+
+def compile_task_plan(task: Task) -> TaskPlan:
+    """根据任务配置构建执行计划"""
+    train_codes = None
+    if task.train_codes:
+        train_codes = frozenset(c.strip() for c in task.train_codes.split(",") if c.strip())
+
+    train_types = None
+    if task.train_types:
+        train_types = frozenset(t.strip() for t in task.train_types.split(",") if t.strip())
+
+    seat_codes = task.seat_types.split(",") if task.seat_types else ["O"]
+    seat_columns = tuple(
+        (code, *SEAT_COLUMNS[code])
+        for code in (c.strip() for c in seat_codes)
+        if code in SEAT_COLUMNS
+    )
+
+    start_min = start_max = None
+    if task.start_time_range:
+        parts = task.start_time_range.split("-")
+        if len(parts) == 2:
+            start_min, start_max = _parse_minutes(parts[0]), _parse_minutes(parts[1])
+            if start_min is None or start_max is None:
+                start_min = start_max = None
+
+    try:
+        passengers_data = json.loads(task.passengers) if task.passengers else []
+    except json.JSONDecodeError:
+        passengers_data = []
+    passengers = MappingProxyType({
+        (p["passenger_name"], p["passenger_id_no"]): p.get("passenger_type")
+        for p in passengers_data
+    })
+
+    return TaskPlan(
+        task_id=task.id,
+        from_station=task.from_station,
+        to_station=task.to_station,
+        train_date=task.train_date,
+        auto_submit=task.auto_submit,
+        train_codes=train_codes,
+        train_types=train_types,
+        seat_columns=seat_columns,
+        start_min=start_min,
+        start_max=start_max,
+        passengers=passengers,
+    )
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务日志保留清理
+
+定期删除已结束任务的过期日志（分批删除，避免长时间占用写锁）和过期的下单步骤耗时记录，
+删除了数据后以增量方式回收 SQLite 空闲页（需事先通过迁移脚本的 --enable-incremental-vacuum 启用）
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal, engine
+from ..models.task import Task, TaskLog, OrderSpan, TaskStatus, china_now
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 日志可被清理的任务状态
+FINISHED_STATUSES = (TaskStatus.SUCCESS, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+# SQLite auto_vacuum 取值
+_AUTO_VACUUM_INCREMENTAL = 2
+
+# 未启用增量回收的提示只记录一次
+_vacuum_hint_logged = False
+
+
+async def prune_task_logs() -> int:
+    """
+    删除已结束任务中超过保留期的日志
+
+    Returns:
+        删除的日志条数
+    """
+    if settings.TASK_LOG_RETENTION_DAYS <= 0:
+        return 0
+
+    cutoff = china_now() - timedelta(days=settings.TASK_LOG_RETENTION_DAYS)
+    expired_ids = (
+        select(TaskLog.id)
+        .join(Task, Task.id == TaskLog.task_id)
+        .where(
+            Task.status.in_(FINISHED_STATUSES),
+            func.coalesce(TaskLog.last_at, TaskLog.created_at) < cutoff,
+        )
+        .limit(settings.TASK_LOG_PRUNE_CHUNK)
+    )
+
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(TaskLog)
+                .where(TaskLog.id.in_(expired_ids.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        total += result.rowcount
+        if result.rowcount < settings.TASK_LOG_PRUNE_CHUNK:
+            return total
+        # 让出写锁给刷票任务
+        await asyncio.sleep(0.1)
+
+
+async def prune_order_spans() -> int:
+    """删除超过保留期的下单步骤耗时记录"""
+    if settings.ORDER_SPAN_RETENTION_DAYS <= 0:
+        return 0
+
+    cutoff = china_now() - timedelta(days=settings.ORDER_SPAN_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(OrderSpan).where(OrderSpan.created_at < cutoff))
+        await db.commit()
+    return result.rowcount
+
+
+async def enable_incremental_vacuum() -> bool:
+    """
+    将 SQLite 切换为 auto_vacuum=INCREMENTAL（一次性维护操作）
+
+    切换需要执行完整 VACUUM，会重写整个数据库并长时间持有写锁，
+    只应在服务停止时通过迁移脚本显式执行，不在定时任务中调用
+
+    Returns:
+        是否执行了切换（非 SQLite 或已启用时返回 False）
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        auto_vacuum = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if auto_vacuum == _AUTO_VACUUM_INCREMENTAL:
+            return False
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+    return True
+
+
+async def reclaim_sqlite_pages():
+    """
+    增量回收 SQLite 空闲页（仅在数据库已启用 auto_vacuum=INCREMENTAL 时执行）
+    """
+    global _vacuum_hint_logged
+    if engine.dialect.name != "sqlite":
+        return
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        auto_vacuum = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if auto_vacuum != _AUTO_VACUUM_INCREMENTAL:
+            if not _vacuum_hint_logged:
+                _vacuum_hint_logged = True
+                logger.info(
+                    "[日志清理] SQLite 未启用增量回收，空闲页不会归还磁盘；"
+                    "可在停止服务后执行 add_global_schedule_tables.py --enable-incremental-vacuum"
+                )
+            return
+
+        free_pages = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        if free_pages:
+            # incremental_vacuum 每步只回收一页，execute 只执行一步，需用 executescript 执行完毕
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(
+                f"PRAGMA incremental_vacuum({int(settings.SQLITE_VACUUM_PAGES)});"
+            )
+            remaining = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+            logger.info(f"[日志清理] 已回收 {free_pages - remaining} 个空闲页，剩余 {remaining}")
+
+
+async def run_log_retention():
+    """执行一次日志清理，有数据被删除时回收空间"""
+    deleted_logs = await prune_task_logs()
+    if deleted_logs:
+        logger.info(f"[日志清理] 已删除 {deleted_logs} 条过期日志")
+    deleted_spans = await prune_order_spans()
+    if deleted_spans:
+        logger.info(f"[日志清理] 已删除 {deleted_spans} 条过期下单耗时记录")
+    if deleted_logs or deleted_spans:
+        await reclaim_sqlite_pages()
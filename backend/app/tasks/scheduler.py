@@ -3,31 +3,39 @@
 """
 任务调度器
 
-使用 APScheduler 实现定时刷票和任务管理
+刷票节拍由 TickEngine 驱动，APScheduler 负责全局定时启动等 cron 任务
 """
 
 import json
+import time
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Set
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.asyncio import AsyncIOExecutor
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 
 from ..core.config import get_settings
 from ..core.database import AsyncSessionLocal
-from ..models.user import User
-from ..models.task import Task, TaskLog, TaskStatus
+from ..models.task import Task, TaskStatus
 from ..services.login_service import LoginService
 from ..services.query_service import QueryService
 from ..services.order_service import OrderService, Passenger
+from ..services.order_session import OrderSession, get_order_session_pool
+from .plan import seat_available
+from .state import TaskState, TaskStateStore
+from .log_sink import get_log_sink
+from .spans import get_span_recorder
+from .notifier import get_notification_dispatcher
+from .ticker import TickEngine
+from .retention import run_log_retention
+from .lease import LeaseManager
 
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from ..models.config import SystemConfig
-from ..utils import notify
 
 settings = get_settings()
 
@@ -36,6 +44,11 @@ class TicketScheduler:
     
     _instance: Optional["TicketScheduler"] = None
     
+    # 停止任务时等待进行中的节拍清理完成的最长时间（秒）
+    TICK_CANCEL_TIMEOUT = 1.0
+    # 关闭时等待进行中的节拍和下单结果处理完成的最长时间（秒）
+    SHUTDOWN_DRAIN_TIMEOUT = 5.0
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -70,31 +83,87 @@ class TicketScheduler:
             timezone=settings.SCHEDULER_TIMEZONE
         )
         
+        # 刷票节拍器（每个任务一个节拍，相位错开且不重叠执行）
+        self.ticker = TickEngine(self._run_ticket_task)
+        
         # 活动任务追踪
         self._active_tasks: Dict[int, bool] = {}  # task_id -> is_running
         
+        # 已发出确认订单请求的节拍（订单可能已在排队，停止任务时不中断）
+        self._confirmed_ticks: Set[int] = set()
+        # 进行中的下单结果处理（成功/结果未知）
+        self._outcome_tasks: Set[asyncio.Task] = set()
+        
+        # 运行中任务的内存状态（执行计划、重试计数等，周期性回写数据库）
+        self.state_store = TaskStateStore()
+        
+        # 任务日志缓冲写入
+        self.log_sink = get_log_sink()
+        
+        # 下单步骤耗时记录
+        self.span_recorder = get_span_recorder()
+        
+        # 通知后台推送
+        self.notifier = get_notification_dispatcher()
+        
         # 服务实例缓存
         self._login_services: Dict[str, LoginService] = {}
         
         # 全局定时任务 ID
         self.GLOBAL_JOB_ID = "global_task_starter"
+        # 日志清理任务 ID
+        self.LOG_RETENTION_JOB_ID = "task_log_retention"
         
         # 通知配置缓存
         self._notification_config: Dict = {}
+        
+        # 当前生效的全局定时配置 (cron, enabled)
+        self._global_schedule: tuple = (None, False)
+        
+        # 任务租约（独立 worker 进程中启用）
+        self.lease_manager: Optional[LeaseManager] = None
     
-    def start(self):
-        """启动调度器"""
+    @property
+    def running(self) -> bool:
+        """本进程是否运行调度器（API 与 worker 分离部署时 API 进程不运行）"""
+        return self.scheduler.running
+    
+    def start(self, use_leases: bool = False):
+        """
+        启动调度器
+        
+        Args:
+            use_leases: 通过租约认领任务（独立 worker 进程，可多进程部署）
+        """
         if not self.scheduler.running:
             self.scheduler.start()
+            self.ticker.start()
+            self.state_store.start()
+            self.log_sink.start()
+            self.notifier.start()
             self.logger.info("[调度] 调度器已启动")
             
             # 尝试加载全局定时配置
             asyncio.create_task(self._load_global_schedule())
             # 加载通知配置
             asyncio.create_task(self.reload_notification_config())
+            # 启动下单会话保活
+            get_order_session_pool().start()
+            # 定期清理已结束任务的过期日志和过期的下单耗时记录
+            if settings.TASK_LOG_RETENTION_DAYS > 0 or settings.ORDER_SPAN_RETENTION_DAYS > 0:
+                self.scheduler.add_job(
+                    self._run_log_retention,
+                    IntervalTrigger(seconds=settings.TASK_LOG_RETENTION_INTERVAL),
+                    id=self.LOG_RETENTION_JOB_ID,
+                    replace_existing=True
+                )
+            # 租约模式：由租约管理器认领运行中的任务
+            if use_leases:
+                self.lease_manager = LeaseManager(self)
+                self.lease_manager.start()
     
     async def _load_global_schedule(self):
-        """加载初始的全局定时配置"""
+        """加载全局定时配置（与当前生效配置不同时才重新设置）"""
         async with AsyncSessionLocal() as db:
             cron_res = await db.execute(select(SystemConfig).where(SystemConfig.key == "global_schedule_cron"))
             cron_cfg = cron_res.scalar_one_or_none()
@@ -102,11 +171,19 @@ class TicketScheduler:
             enabled_res = await db.execute(select(SystemConfig).where(SystemConfig.key == "global_schedule_enabled"))
             enabled_cfg = enabled_res.scalar_one_or_none()
             
-            if cron_cfg and enabled_cfg and enabled_cfg.value == "true":
-                self.update_global_schedule(cron_cfg.value, True)
+            cron_str = cron_cfg.value if cron_cfg else None
+            enabled = bool(cron_cfg and enabled_cfg and enabled_cfg.value == "true")
+            if (cron_str, enabled) != self._global_schedule:
+                self.update_global_schedule(cron_str, enabled)
+    
+    async def sync_config(self):
+        """重新加载由 API 进程修改的配置（worker 进程定期调用）"""
+        await self._load_global_schedule()
+        await self.reload_notification_config()
 
     def update_global_schedule(self, cron_str: str, enabled: bool):
         """更新全局定时任务"""
+        self._global_schedule = (cron_str, enabled)
         try:
             # 先尝试移除旧的
             if self.scheduler.get_job(self.GLOBAL_JOB_ID):
@@ -129,26 +206,47 @@ class TicketScheduler:
         """全局定时任务执行体：启动所有符合条件的任务"""
         self.logger.info("[调度] 全局定时任务触发，开始扫描可启动任务...")
         async with AsyncSessionLocal() as db:
-            # 查找所有非运行中且允许定时启动的任务
+            # 查找所有非运行中且允许定时启动的任务，并在同一事务内认领（置为运行中）
+            # PostgreSQL 下加行锁并跳过已被其他进程锁定的任务，多进程部署时同一任务只会被认领一次
             stmt = select(Task).where(
                 Task.status != TaskStatus.RUNNING,
                 Task.allow_scheduled_start == True
-            )
+            ).with_for_update(skip_locked=True)
             result = await db.execute(stmt)
             tasks = result.scalars().all()
             
-            count = 0
             for task in tasks:
-                self.logger.info(f"[调度] 全局唤醒任务 {task.id}: {task.name}")
-                # 记录日志
-                await self._add_log(db, task.id, "info", "全局定时任务触发，自动启动任务")
-                await db.commit() # 提交日志
-                
-                # 启动任务
-                await self.start_task(task.id)
-                count += 1
+                task.status = TaskStatus.RUNNING
+                task.started_at = datetime.utcnow() + timedelta(hours=8)
+                task.result_message = None
+            await db.commit()
+        
+        if self.lease_manager is not None:
+            # 租约模式：由各 worker 认领刚置为运行中的任务
+            for task in tasks:
+                await self._add_log(task.id, "info", "全局定时任务触发，自动启动任务")
+            self.lease_manager.wake()
+            self.logger.info(f"[调度] 全局定时任务完成，共启动 {len(tasks)} 个任务")
+            return
+        
+        count = 0
+        for task in tasks:
+            self.logger.info(f"[调度] 全局唤醒任务 {task.id}: {task.name}")
+            # 记录日志
+            await self._add_log(task.id, "info", "全局定时任务触发，自动启动任务")
             
-            self.logger.info(f"[调度] 全局定时任务完成，共启动 {count} 个任务")
+            # 启动任务
+            await self.start_task(task.id)
+            count += 1
+        
+        self.logger.info(f"[调度] 全局定时任务完成，共启动 {count} 个任务")
+
+    async def _run_log_retention(self):
+        """日志清理任务执行体"""
+        try:
+            await run_log_retention()
+        except Exception as e:
+            self.logger.error(f"[调度] 日志清理失败: {e}")
 
     async def reload_notification_config(self):
         """重新加载通知配置"""
@@ -165,25 +263,43 @@ class TicketScheduler:
                     self.logger.error(f"[调度] 通知配置解析失败: {e}")
             else:
                 self._notification_config = {}
+        # 推送计划只在配置变更时构建
+        self.notifier.prepare(self._notification_config)
 
-    def _send_notification(self, title: str, content: str):
-        """发送通知"""
-        if not self._notification_config:
-            return
-            
-        try:
-            notify.send(title, content, ignore_default_config=True, **self._notification_config)
-        except Exception as e:
-            self.logger.error(f"[调度] 发送通知失败: {e}")
+    def _send_notification(self, title: str, content: str, urgent: bool = False):
+        """
+        发送通知（交给后台推送，立即返回）
+        
+        普通通知在短时间内按标题合并；urgent（抢票成功）立即推送
+        """
+        self.notifier.submit(title, content, urgent=urgent)
 
-    def shutdown(self):
+    async def shutdown(self):
         """关闭调度器"""
         if self.scheduler.running:
+            ticks = self.ticker.running_ticks()
+            self.ticker.shutdown()
+            # 等待被取消的节拍完成清理（已确认下单的节拍会转为结果未知处理）
+            if ticks:
+                await asyncio.wait(ticks, timeout=self.SHUTDOWN_DRAIN_TIMEOUT)
+            if self._outcome_tasks:
+                await asyncio.wait(set(self._outcome_tasks), timeout=self.SHUTDOWN_DRAIN_TIMEOUT)
             self.scheduler.shutdown(wait=True)
+            # 写入尚未回写的任务状态，释放租约
+            await self.state_store.stop()
+            if self.lease_manager is not None:
+                await self.lease_manager.stop()
+                self.lease_manager = None
+            await self.log_sink.stop()
+            await self.span_recorder.stop()
+            await self.notifier.stop()
             self.logger.info("[调度] 调度器已关闭")
 
     async def resume_tasks(self):
         """恢复运行中的任务"""
+        if self.lease_manager is not None:
+            # 租约模式下由租约管理器认领
+            return
         self.logger.info("[调度] 正在恢复运行中的任务...")
         async with AsyncSessionLocal() as db:
             stmt = select(Task).where(Task.status == TaskStatus.RUNNING)
@@ -197,17 +313,14 @@ class TicketScheduler:
     
     async def start_task(self, task_id: int):
         """启动抢票任务"""
-        if task_id in self._active_tasks:
+        if not self.running or task_id in self._active_tasks:
             return
         
         self._active_tasks[task_id] = True
         
-        # 添加定时任务
-        job_id = f"ticket_task_{task_id}"
-        
-        # 获取任务信息以确定刷票间隔
+        # 获取任务信息以确定刷票间隔（行锁保证状态切换不与其他进程交错）
         async with AsyncSessionLocal() as db:
-            stmt = select(Task).where(Task.id == task_id)
+            stmt = select(Task).where(Task.id == task_id).with_for_update()
             result = await db.execute(stmt)
             task = result.scalar_one_or_none()
             
@@ -222,221 +335,257 @@ class TicketScheduler:
                 task.result_message = None # 清除旧的错误信息
                 await db.commit()
             
+            # 加载内存状态（含预编译的执行计划）
+            self.state_store.load(task)
+            
             interval = max(task.query_interval, settings.MIN_QUERY_INTERVAL)
         
-        self.scheduler.add_job(
-            self._run_ticket_task,
-            'interval',
-            seconds=interval,
-            id=job_id,
-            args=[task_id],
-            replace_existing=True
-        )
+        # 添加刷票节拍（首次立即执行，之后的节拍按相位错开）
+        self.ticker.add(task_id, interval)
         
         self.logger.info(f"[调度] 任务 {task_id} 已启动 (间隔: {interval}秒)")
-        
-        # 立即执行一次 (异步执行，避免阻塞 API)
-        asyncio.create_task(self._run_ticket_task(task_id))
     
     async def stop_task(self, task_id: int):
         """停止抢票任务"""
-        job_id = f"ticket_task_{task_id}"
-        
         if task_id in self._active_tasks:
             del self._active_tasks[task_id]
         
-        try:
-            self.scheduler.remove_job(job_id)
+        if self.ticker.has(task_id):
+            self.ticker.remove(task_id)
             self.logger.info(f"[Scheduler] 任务 {task_id} 已停止")
-        except Exception:
-            pass
+        
+        # 立即中断进行中的刷票（查票、下单、排队等待）
+        await self._cancel_tick(task_id)
+        
+        state = self.state_store.get(task_id)
+        await self.state_store.remove(task_id)
+        self.log_sink.end_runs(task_id)
+        if self.lease_manager is not None:
+            await self.lease_manager.release(task_id)
+        
+        # 账号已无运行中的任务时释放其下单会话（连接和乘车人缓存）
+        if state is not None and not self.state_store.has_user(state.user_id):
+            await get_order_session_pool().discard(state.user_id)
+    
+    async def _cancel_tick(self, task_id: int):
+        """
+        取消任务正在执行的节拍并等待其清理完成（在节拍内部停止自身时跳过）
+
+        确认订单请求已发出的节拍不取消：让其继续等待出票结果并完成成功/结果未知的处理
+        """
+        tick = self.ticker.current_tick(task_id)
+        if tick is None or tick.done() or tick is asyncio.current_task():
+            return
+        if task_id in self._confirmed_ticks:
+            self.logger.info(f"[调度] 任务 {task_id} 已发出确认订单，等待本次下单结果后停止")
+            return
+        tick.cancel()
+        await asyncio.wait({tick}, timeout=self.TICK_CANCEL_TIMEOUT)
+    
+    def reload_task(self, task: Task):
+        """任务被重新启动后重新加载内存状态（重试计数等）"""
+        if task.id in self._active_tasks:
+            self.state_store.load(task)
+            self.log_sink.end_runs(task.id)
+    
+    def invalidate_user(self, user_id: int):
+        """用户登录状态变化后，下次刷票时重新读取会话"""
+        self.state_store.invalidate_user(user_id)
     
     async def _run_ticket_task(self, task_id: int):
         """执行抢票任务"""
         if task_id not in self._active_tasks:
             return
         
-        async with AsyncSessionLocal() as db:
-            # 获取任务
-            stmt = select(Task).where(Task.id == task_id)
-            result = await db.execute(stmt)
-            task = result.scalar_one_or_none()
-            
-            if not task:
-                await self.stop_task(task_id)
-                return
-            
-            # 检查任务状态
-            if task.status != TaskStatus.RUNNING:
-                await self.stop_task(task_id)
-                return
-            
-            # 检查重试次数 (max_retry_count < 0 表示无限重试)
-            if task.max_retry_count > 0 and task.retry_count >= task.max_retry_count:
-                task.status = TaskStatus.FAILED
-                task.result_message = "超过最大重试次数"
-                task.finished_at = datetime.utcnow() + timedelta(hours=8)
-                
-                await self._add_log(db, task_id, "error", "任务失败：超过最大重试次数")
-                
-                cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                msg_content = (
-                    f"原因: 超过最大重试次数\n"
-                    f"🚄 任务: {task.from_station}-{task.to_station}\n"
-                    f"⚠️ 任务已自动停止。\n\n"
-                    f"🕒 {cur_time_str}"
-                )
-                self._send_notification(f"12306助手：\n❌抢票失败", msg_content)
-                await db.commit()
-                await self.stop_task(task_id)
-                return
-            
-            # 增加重试计数
-            task.retry_count += 1
-            await db.commit()
+        state = self.state_store.get(task_id)
+        if state is None:
+            await self.stop_task(task_id)
+            return
+        plan = state.plan
+        
+        # 检查重试次数 (max_retry_count < 0 表示无限重试)
+        if state.retry_exhausted:
+            await self.state_store.finish(state, TaskStatus.FAILED, "超过最大重试次数")
+            await self._add_log(task_id, "error", "任务失败：超过最大重试次数")
             
-            # 获取用户登录信息
-            stmt = select(User).where(User.id == task.user_id)
-            result = await db.execute(stmt)
-            user = result.scalar_one_or_none()
+            cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            msg_content = (
+                f"原因: 超过最大重试次数\n"
+                f"🚄 任务: {plan.from_station}-{plan.to_station}\n"
+                f"⚠️ 任务已自动停止。\n\n"
+                f"🕒 {cur_time_str}"
+            )
+            self._send_notification(f"12306助手：\n❌抢票失败", msg_content)
+            await self.stop_task(task_id)
+            return
+        
+        # 增加重试计数（内存中累加，周期性批量回写）
+        self.state_store.increment_retry(state)
+        
+        # 获取用户登录信息
+        cookies = await self.state_store.get_user_cookies(state.user_id)
+        
+        if not cookies:
+            await self.state_store.finish(state, TaskStatus.FAILED, "用户未登录")
+            await self._add_log(task_id, "error", "用户未登录")
             
-            if not user or not user.session_data:
-                await self._add_log(db, task_id, "error", "用户未登录")
-                
-                cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                msg_content = (
-                    f"原因: 用户未登录或会话丢失\n"
-                    f"🚄 任务: {task.from_station}-{task.to_station}\n"
-                    f"⚠️ 请重新登录后重启任务。\n\n"
-                    f"🕒 {cur_time_str}"
-                )
-                self._send_notification(f"12306助手：\n⚠️抢票异常", msg_content)
-                task.status = TaskStatus.FAILED
-                task.result_message = "用户未登录"
-                await db.commit()
-                await self.stop_task(task_id)
-                return
+            cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            msg_content = (
+                f"原因: 用户未登录或会话丢失\n"
+                f"🚄 任务: {plan.from_station}-{plan.to_station}\n"
+                f"⚠️ 请重新登录后重启任务。\n\n"
+                f"🕒 {cur_time_str}"
+            )
+            self._send_notification(f"12306助手：\n⚠️抢票异常", msg_content)
+            await self.stop_task(task_id)
+            return
+        
+        # 执行查票
+        await self._add_log(task_id, "info", f"第 {state.retry_count} 次刷票...")
+        
+        # 占用账号的预热下单会话（cookies 变化时自动重建），节拍结束时释放
+        order_session = await get_order_session_pool().acquire(state.user_id, cookies)
+        
+        # 下单结果处理（成功/结果未知）在独立任务中完成，节拍被取消也不会中断
+        outcome: Optional[asyncio.Task] = None
+        try:
+            success, order_id, message, extra_data = await self._query_and_order(
+                state, order_session
+            )
             
-            session_data = json.loads(user.session_data)
-            # 兼容处理：如果是新格式（包含 cookies 键），取 cookies；否则假设整个对象就是 cookies 字典
-            if "cookies" in session_data and isinstance(session_data["cookies"], dict):
-                cookies = session_data["cookies"]
+            if success:
+                outcome = self._spawn_outcome(self._on_order_success(state, order_id, message, extra_data))
+                await asyncio.shield(outcome)
+            elif extra_data and extra_data.get("order_unknown"):
+                outcome = self._spawn_outcome(self._on_order_unknown(state, message, extra_data))
+                await asyncio.shield(outcome)
             else:
-                cookies = session_data
-            
-            # 执行查票
-            await self._add_log(db, task_id, "info", f"第 {task.retry_count} 次刷票...")
-            await db.commit()
-            
-            try:
-                success, order_id, message, extra_data = await self._query_and_order(
-                    task, cookies, db
-                )
+                await self._add_log(task_id, "info", message)
                 
-                if success:
-                    task.status = TaskStatus.SUCCESS
-                    task.order_id = order_id
-                    task.result_message = message
-                    task.finished_at = datetime.utcnow() + timedelta(hours=8)
-                    
-                    await self._add_log(db, task_id, "success", f"抢票成功！订单号: {order_id}")
+                # 检查是否因为未登录导致失败
+                if "未登录" in message or "登录已过期" in message:
+                    await self.state_store.finish(state, TaskStatus.FAILED, message)
+                    await self._add_log(task_id, "error", f"任务停止: {message}")
                     
                     cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    # 默认值
-                    train_code = extra_data.get("train_code", "")
-                    start_time = extra_data.get("start_time", "")
-                    arrive_time = extra_data.get("arrive_time", "")
-                    seat_name = extra_data.get("seat_name", "")
-                    passenger_names = extra_data.get("passenger_names", [])
-                    passenger_str = ", ".join(passenger_names)
-                    
                     msg_content = (
-                        f"🎫 订单号: {order_id}\n"
-                        f"🚄 车次: {train_code} ({task.from_station}-{task.to_station})\n"
-                        f"⏰ 时间: {task.train_date} {start_time} - {arrive_time}\n"
-                        f"💺 席别: {seat_name}\n"
-                        f"👥 乘车人: {passenger_str}\n"
-                        f"🎉 恭喜！已成功下单。\n\n"
-                        f"💰 请尽快前往 12306 支付！\n"
+                        f"原因: {message}\n"
+                        f"🚄 任务: {plan.from_station}-{plan.to_station}\n"
+                        f"⚠️ 任务已异常停止。\n\n"
                         f"🕒 {cur_time_str}"
                     )
-                    self._send_notification(f"12306助手：\n✅抢票成功！", msg_content)
+                    self._send_notification(f"12306助手：\n⚠️抢票异常", msg_content)
+                    self.state_store.invalidate_user(state.user_id)
+                    await get_order_session_pool().discard(state.user_id)
                     await self.stop_task(task_id)
-                else:
-                    await self._add_log(db, task_id, "info", message)
-                    
-                    # 检查是否因为未登录导致失败
-                    if "未登录" in message or "登录已过期" in message:
-                        task.status = TaskStatus.FAILED
-                        task.result_message = message
-                        task.finished_at = datetime.utcnow() + timedelta(hours=8)
-                        await self._add_log(db, task_id, "error", f"任务停止: {message}")
-                        
-                        cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        msg_content = (
-                            f"原因: {message}\n"
-                            f"🚄 任务: {task.from_station}-{task.to_station}\n"
-                            f"⚠️ 任务已异常停止。\n\n"
-                            f"🕒 {cur_time_str}"
-                        )
-                        self._send_notification(f"12306助手：\n⚠️抢票异常", msg_content)
-                        await self.stop_task(task_id)
-                
-                await db.commit()
-                
-            except Exception as e:
-                await self._add_log(db, task_id, "error", f"执行异常: {str(e)}")
-                await db.commit()
+            
+        except asyncio.CancelledError:
+            if outcome is None and task_id in self._confirmed_ticks:
+                # 确认订单已发出后被中断（如服务关闭）：订单可能已在排队，按结果未知处理
+                outcome = self._spawn_outcome(
+                    self._on_order_unknown(state, "刷票被中断，下单结果未知，请前往 12306 查看未完成订单", {})
+                )
+            elif outcome is None:
+                await self._add_log(task_id, "warning", "进行中的刷票已中断")
+            raise
+        except Exception as e:
+            await self._add_log(task_id, "error", f"执行异常: {str(e)}")
+            if outcome is None and task_id in self._confirmed_ticks:
+                outcome = self._spawn_outcome(
+                    self._on_order_unknown(state, f"下单过程异常，结果未知: {e}", {})
+                )
+                await asyncio.shield(outcome)
+        finally:
+            self._confirmed_ticks.discard(task_id)
+            await get_order_session_pool().release(order_session)
+    
+    def _spawn_outcome(self, coro) -> asyncio.Task:
+        """在独立任务中处理下单结果（保留引用，关闭时等待其完成）"""
+        task = asyncio.create_task(coro)
+        self._outcome_tasks.add(task)
+        task.add_done_callback(self._outcome_tasks.discard)
+        return task
+    
+    async def _on_order_success(self, state: TaskState, order_id: str, message: str, extra_data: Dict):
+        """下单成功：记录订单并立即推送通知"""
+        task_id = state.task_id
+        plan = state.plan
+        await self.state_store.finish(state, TaskStatus.SUCCESS, message, order_id=order_id)
+        
+        await self._add_log(task_id, "success", f"抢票成功！订单号: {order_id}")
+        
+        cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # 默认值
+        train_code = extra_data.get("train_code", "")
+        start_time = extra_data.get("start_time", "")
+        arrive_time = extra_data.get("arrive_time", "")
+        seat_name = extra_data.get("seat_name", "")
+        passenger_names = extra_data.get("passenger_names", [])
+        passenger_str = ", ".join(passenger_names)
+        
+        msg_content = (
+            f"🎫 订单号: {order_id}\n"
+            f"🚄 车次: {train_code} ({plan.from_station}-{plan.to_station})\n"
+            f"⏰ 时间: {plan.train_date} {start_time} - {arrive_time}\n"
+            f"💺 席别: {seat_name}\n"
+            f"👥 乘车人: {passenger_str}\n"
+            f"🎉 恭喜！已成功下单。\n\n"
+            f"💰 请尽快前往 12306 支付！\n"
+            f"🕒 {cur_time_str}"
+        )
+        self._send_notification(f"12306助手：\n✅抢票成功！", msg_content, urgent=True)
+        await self.stop_task(task_id)
+    
+    async def _on_order_unknown(self, state: TaskState, message: str, extra_data: Dict):
+        """下单结果未知：订单可能已提交，暂停任务并立即推送通知，由用户确认后再决定是否继续"""
+        task_id = state.task_id
+        plan = state.plan
+        await self.state_store.finish(state, TaskStatus.PAUSED, message)
+        await self._add_log(task_id, "warning", f"任务已暂停: {message}")
+        
+        cur_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        msg_content = (
+            f"🚄 车次: {extra_data.get('train_code', '')} ({plan.from_station}-{plan.to_station})\n"
+            f"💺 席别: {extra_data.get('seat_name', '')}\n"
+            f"⚠️ 下单结果未知，订单可能仍在排队，任务已暂停。\n"
+            f"💰 请前往 12306 查看未完成订单，如未下单可重新启动任务。\n\n"
+            f"🕒 {cur_time_str}"
+        )
+        self._send_notification(f"12306助手：\n❓下单结果未知", msg_content, urgent=True)
+        await self.stop_task(task_id)
     
     async def _query_and_order(
         self,
-        task: Task,
-        cookies: Dict,
-        db: AsyncSession
+        state: TaskState,
+        order_session: OrderSession
     ) -> tuple[bool, str, str, Optional[Dict]]:
         """查票并下单"""
-        query_service = QueryService(cookies)
+        task_id = state.task_id
+        plan = state.plan
+        
+        # 余票查询无需登录，使用共享匿名客户端以复用连接
+        query_service = QueryService()
         
         try:
-            # 处理车次类型
-            train_types = None
-            if task.train_types:
-                train_types = task.train_types.split(",")
-            
-            # 处理时间范围
-            time_range = None
-            if task.start_time_range:
-                parts = task.start_time_range.split("-")
-                if len(parts) == 2:
-                    time_range = (parts[0].strip(), parts[1].strip())
-            
-            # 查票
+            # 查票（筛选由执行计划完成，查询结果可在任务间共享）
             trains, error = await query_service.query(
-                from_station=task.from_station,
-                to_station=task.to_station,
-                train_date=task.train_date,
-                train_types=train_types,
-                start_time_range=time_range,
+                from_station=plan.from_station,
+                to_station=plan.to_station,
+                train_date=plan.train_date,
                 only_has_ticket=False
             )
             
             if error:
                 return False, "", f"查票失败: {error}", None
             
-            if not trains:
+            candidates, trains = plan.match_trains(trains)
+            if not candidates:
                 return False, "", "未查询到任何车次", None
             
             # 过滤指定车次
-            if task.train_codes:
-                target_codes = set(task.train_codes.split(","))
-                trains = [t for t in trains if t.train_code in target_codes]
-                
-                if not trains:
-                    return False, "", "指定车次不存在或已停运", None
-            
-            # 获取席别优先级
-            seat_types = task.seat_types.split(",") if task.seat_types else ["O"]
+            if not trains:
+                return False, "", "指定车次不存在或已停运", None
             
             # 用于记录扫描详情
             scan_details = []
@@ -444,124 +593,104 @@ class TicketScheduler:
             # 遍历车次和席别尝试购票
             for train in trains:
                 # 检查任务是否还在运行列表
-                if task.id not in self._active_tasks:
+                if task_id not in self._active_tasks:
                    return False, "", "任务已暂停或停止", None
 
                 # 收集该车次的席位状态
                 seat_status_list = []
-                has_ticket_for_train = False
                 
-                for seat_type in seat_types:
-                    # 检查该席别是否有票
-                    seat_map = {
-                        "9": ("商务座", train.business_seat),
-                        "M": ("一等座", train.first_seat),
-                        "O": ("二等座", train.second_seat),
-                        "4": ("软卧", train.soft_sleeper),
-                        "3": ("硬卧", train.hard_sleeper),
-                        "1": ("硬座", train.hard_seat),
-                    }
+                for seat_type, seat_name, seat_attr in plan.seat_columns:
+                    seat_count = getattr(train, seat_attr)
+                    seat_status_list.append(f"{seat_name}:{seat_count}")
                     
-                    if seat_type not in seat_map:
+                    # 检查是否有票可买
+                    if not seat_available(seat_count) or not train.secret_str:
                         continue
-                        
-                    seat_name, seat_count = seat_map[seat_type]
-                    seat_status_list.append(f"{seat_name}:{seat_count}")
+
+                    if not plan.auto_submit:
+                        # 仅提示，外部会记录
+                        msg = f"发现余票: {train.train_code} {seat_name}({seat_count})"
+                        return False, "", f"{msg}, 等待手动下单", None
+
+                    # 尝试下单
+                    await self._add_log(
+                        task_id, "info",
+                        f"发现余票: {train.train_code} {seat_name}({seat_count}), 尝试下单..."
+                    )
                     
-                    # 检查是否有票可买（不仅是显示不做任务）
-                    can_buy = False
-                    if seat_count not in ("--", "无", "*", ""):
-                         try:
-                             if seat_count == "有" or int(seat_count) > 0:
-                                 can_buy = True
-                         except ValueError:
-                             pass
+                    # 复用账号的预热连接，首个下单请求无需重新握手
+                    order_service = order_session.new_order_service()
                     
-                    if can_buy:
-                        has_ticket_for_train = True
-                        if not train.secret_str:
+                    try:
+                        # 获取账号的乘车人列表（包含 all_enc_str，优先使用会话缓存）
+                        success, api_passengers, error = await order_session.get_passengers()
+                        if not success or not api_passengers:
+                            await self._add_log(
+                                task_id, "warning",
+                                f"获取乘车人失败: {error or '无法获取乘车人列表'}"
+                            )
                             continue
-
-                        # 尝试下单
-                        if task.auto_submit:
+                        
+                        # 匹配乘车人：根据姓名和身份证号匹配
+                        matched_passengers = plan.match_passengers(api_passengers)
+                        if not matched_passengers:
+                            await self._add_log(
+                                task_id, "warning",
+                                f"未找到匹配的乘车人，请检查乘车人信息是否正确"
+                            )
+                            continue
+                        
+                        result = await order_service.buy_ticket(
+                            train_info=train,
+                            secret_str=train.secret_str,
+                            passengers=matched_passengers,
+                            seat_type=seat_type,
+                            deadline=time.monotonic() + settings.ORDER_TIMEOUT,
+                            queue_ratio=settings.ORDER_QUEUE_ABORT_RATIO if settings.ORDER_QUEUE_ABORT_ENABLED else None,
+                            # 确认订单发出后停止任务不再中断本次节拍
+                            on_confirm=lambda: self._confirmed_ticks.add(task_id)
+                        )
+                        self.span_recorder.record(task_id, result)
+                        
+                        if result.success:
+                            extra_data = {
+                                "train_code": train.train_code,
+                                "start_time": train.start_time,
+                                "arrive_time": train.arrive_time,
+                                "seat_name": seat_name,
+                                "passenger_names": [p.passenger_name for p in matched_passengers]
+                            }
+                            return True, result.order_id, f"购票成功！", extra_data
+                        
+                        # 结果未知时订单可能已在排队，不能继续尝试其他席别，否则可能重复下单
+                        if result.unknown:
                             await self._add_log(
-                                db, task.id, "info",
-                                f"发现余票: {train.train_code} {seat_name}({seat_count}), 尝试下单..."
+                                task_id, "error",
+                                f"下单结果未知: {result.message}",
+                                details=" | ".join(f"{step} {ms:.0f}ms" for step, ms in result.step_times.items()) or None
                             )
-                            await db.commit()
-                            
-                            order_service = OrderService(cookies)
-                            
-                            try:
-                                # 解析任务中保存的乘车人信息（用于匹配）
-                                passengers_data = json.loads(task.passengers)
-                                target_passengers = {
-                                    (p["passenger_name"], p["passenger_id_no"]): p
-                                    for p in passengers_data
-                                }
-                                
-                                # 从 12306 获取最新的乘车人列表（包含 all_enc_str）
-                                success, api_passengers, error = await order_service.query_passengers()
-                                if not success or not api_passengers:
-                                    await self._add_log(
-                                        db, task.id, "warning",
-                                        f"获取乘车人失败: {error or '无法获取乘车人列表'}"
-                                    )
-                                    await db.commit()
-                                    continue
-                                
-                                # 匹配乘车人：根据姓名和身份证号匹配
-                                matched_passengers = []
-                                for api_passenger in api_passengers:
-                                    key = (api_passenger.passenger_name, api_passenger.passenger_id_no)
-                                    if key in target_passengers:
-                                        # 获取任务中设置的乘客类型作为购票类型
-                                        target_p = target_passengers[key]
-                                        # 关键修改：允许用户指定购票类型（如学生买成人票）
-                                        if "passenger_type" in target_p:
-                                            api_passenger.ticket_type = target_p["passenger_type"]
-                                            
-                                        # 使用 API 返回的乘客信息（包含最新的 all_enc_str）
-                                        matched_passengers.append(api_passenger)
-                                
-                                if not matched_passengers:
-                                    await self._add_log(
-                                        db, task.id, "warning",
-                                        f"未找到匹配的乘车人，请检查乘车人信息是否正确"
-                                    )
-                                    await db.commit()
-                                    continue
-                                
-                                result = await order_service.buy_ticket(
-                                    train_info=train,
-                                    secret_str=train.secret_str,
-                                    passengers=matched_passengers,
-                                    seat_type=seat_type
-                                )
-                                
-                                if result.success:
-                                    extra_data = {
-                                        "train_code": train.train_code,
-                                        "start_time": train.start_time,
-                                        "arrive_time": train.arrive_time,
-                                        "seat_name": seat_name,
-                                        "passenger_names": [p.passenger_name for p in matched_passengers]
-                                    }
-                                    return True, result.order_id, f"购票成功！", extra_data
-                                else:
-                                    await self._add_log(
-                                        db, task.id, "warning",
-                                        f"下单失败: {result.message}"
-                                    )
-                                    await db.commit()
-                            finally:
-                                await order_service.close()
-                        else:
-                            # 仅提示
-                            msg = f"发现余票: {train.train_code} {seat_name}({seat_count})"
-                            # 如果还没记录过这个车次的发现日志，记一下（防止scan_details里重复强调）
-                            # 这里直接返回，外部会记录
-                            return False, "", f"{msg}, 等待手动下单", None
+                            extra_data = {
+                                "order_unknown": True,
+                                "train_code": train.train_code,
+                                "seat_name": seat_name,
+                            }
+                            return False, "", "下单结果未知，请前往 12306 查看未完成订单", extra_data
+                        
+                        # 校验被拒可能是乘车人信息（allEncStr）已变更，下次下单前重新获取
+                        if result.step == "check_order_info":
+                            order_session.invalidate_passengers()
+                        await self._add_log(
+                            task_id, "warning",
+                            f"下单失败: {result.message}",
+                            details=" | ".join(f"{step} {ms:.0f}ms" for step, ms in result.step_times.items()) or None
+                        )
+                        
+                        # 订单已明确失败，恢复可中断；等待结果期间任务已被停止时不再尝试其他席别
+                        self._confirmed_ticks.discard(task_id)
+                        if task_id not in self._active_tasks:
+                            return False, "", "任务已暂停或停止", None
+                    finally:
+                        await order_service.close()
                 
                 # 记录该车次状态
                 scan_details.append(f"{train.train_code}[{', '.join(seat_status_list)}]")
@@ -575,20 +704,13 @@ class TicketScheduler:
     
     async def _add_log(
         self,
-        db: AsyncSession,
         task_id: int,
         level: str,
         message: str,
         details: str = None
     ):
-        """添加任务日志"""
-        log = TaskLog(
-            task_id=task_id,
-            level=level,
-            message=message,
-            details=details
-        )
-        db.add(log)
+        """添加任务日志（缓冲后批量写入）"""
+        await self.log_sink.emit(task_id, level, message, details)
 
 
 # 全局调度器实例
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+下单步骤耗时记录
+
+每次下单尝试结束后，将各步骤的耗时（time.monotonic() 计时）连同任务 ID、版本和部署标识
+写入 order_spans 表（后台写入，不阻塞刷票），并按步骤汇总 p50/p95/p99
+"""
+
+import math
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import insert
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..models.task import OrderSpan, china_now
+from ..services.order_service import OrderResult
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def deployment_name() -> str:
+    """部署标识，默认主机名"""
+    return settings.DEPLOYMENT_NAME or socket.gethostname()
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    """最近秩分位数"""
+    idx = max(0, min(len(sorted_values) - 1, math.ceil(p * len(sorted_values)) - 1))
+    return round(sorted_values[idx], 1)
+
+
+def summarize_spans(rows: Iterable[Tuple[str, str, float, bool]]) -> Dict[str, Dict[str, dict]]:
+    """
+    按分组和步骤汇总耗时
+
+    Args:
+        rows: (分组, 步骤, 耗时毫秒, 是否成功)
+
+    Returns:
+        {分组: {步骤: {count, failed, avg_ms, p50_ms, p95_ms, p99_ms, max_ms}}}
+    """
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    failed: Dict[Tuple[str, str], int] = {}
+    for group, step, elapsed_ms, ok in rows:
+        samples.setdefault(group, {}).setdefault(step, []).append(elapsed_ms)
+        if not ok:
+            failed[(group, step)] = failed.get((group, step), 0) + 1
+
+    summary: Dict[str, Dict[str, dict]] = {}
+    for group, steps in samples.items():
+        summary[group] = {}
+        for step, values in steps.items():
+            values.sort()
+            summary[group][step] = {
+                "count": len(values),
+                "failed": failed.get((group, step), 0),
+                "avg_ms": round(sum(values) / len(values), 1),
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+                "max_ms": round(values[-1], 1),
+            }
+    return summary
+
+
+class OrderSpanRecorder:
+    """下单步骤耗时记录器（单例）"""
+
+    _instance: Optional["OrderSpanRecorder"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._pending: Set[asyncio.Task] = set()
+        self._deployment = deployment_name()
+
+    def record(self, task_id: int, result: OrderResult):
+        """记录一次下单尝试的各步骤耗时（后台写入）"""
+        if not result.step_times:
+            return
+        trace_id = uuid.uuid4().hex
+        now = china_now()
+        rows = [
+            {
+                "task_id": task_id,
+                "trace_id": trace_id,
+                "step": step,
+                "elapsed_ms": elapsed_ms,
+                # 失败步骤为最后执行的步骤
+                "ok": result.success or step != result.step,
+                "app_version": settings.APP_VERSION,
+                "deployment": self._deployment,
+                "created_at": now,
+            }
+            for step, elapsed_ms in result.step_times.items()
+        ]
+        write = asyncio.create_task(self._write(rows))
+        self._pending.add(write)
+        write.add_done_callback(self._pending.discard)
+
+    async def _write(self, rows: List[dict]):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(OrderSpan), rows)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"[下单耗时] 写入失败: {e}")
+
+    async def stop(self):
+        """等待尚未完成的写入"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+
+def get_span_recorder() -> OrderSpanRecorder:
+    """获取下单步骤耗时记录器"""
+    return OrderSpanRecorder()
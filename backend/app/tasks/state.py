@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+运行中任务的内存状态
+
+刷票过程中只读写内存中的任务状态，重试计数等变化按周期批量回写数据库（write-behind），
+任务进入终态（成功/失败）时立即同步写入
+"""
+
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..models.user import User
+from ..models.task import Task, TaskStatus
+from .plan import TaskPlan, compile_task_plan
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskState:
+    """运行中任务的状态"""
+    task_id: int
+    user_id: int
+    plan: TaskPlan
+    retry_count: int
+    max_retry_count: int
+
+    @property
+    def retry_exhausted(self) -> bool:
+        """是否超过最大重试次数（max_retry_count <= 0 表示无限重试）"""
+        return self.max_retry_count > 0 and self.retry_count >= self.max_retry_count
+
+
+def parse_session_cookies(session_data: Optional[str]) -> Optional[Dict[str, str]]:
+    """从用户 session_data 中解析 cookies"""
+    if not session_data:
+        return None
+    data = json.loads(session_data)
+    # 兼容处理：如果是新格式（包含 cookies 键），取 cookies；否则假设整个对象就是 cookies 字典
+    if "cookies" in data and isinstance(data["cookies"], dict):
+        return data["cookies"]
+    return data
+
+
+class TaskStateStore:
+    """运行中任务状态存储"""
+
+    def __init__(self):
+        self._states: Dict[int, TaskState] = {}
+        self._dirty: Set[int] = set()
+        # user_id -> (加载时间, cookies)
+        self._user_cookies: Dict[int, Tuple[float, Optional[Dict[str, str]]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # ==================== 状态管理 ====================
+
+    def load(self, task: Task) -> TaskState:
+        """根据数据库中的任务创建内存状态"""
+        state = TaskState(
+            task_id=task.id,
+            user_id=task.user_id,
+            plan=compile_task_plan(task),
+            retry_count=task.retry_count or 0,
+            max_retry_count=task.max_retry_count,
+        )
+        self._states[task.id] = state
+        self._dirty.discard(task.id)
+        return state
+
+    def get(self, task_id: int) -> Optional[TaskState]:
+        return self._states.get(task_id)
+
+    def has_user(self, user_id: int) -> bool:
+        """账号是否还有运行中的任务"""
+        return any(state.user_id == user_id for state in self._states.values())
+
+    def increment_retry(self, state: TaskState):
+        """重试计数 +1（延迟回写）"""
+        state.retry_count += 1
+        self._dirty.add(state.task_id)
+
+    async def remove(self, task_id: int):
+        """移除任务状态，未回写的计数立即写入"""
+        state = self._states.pop(task_id, None)
+        if state is not None and task_id in self._dirty:
+            self._dirty.discard(task_id)
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Task).where(Task.id == task_id).values(retry_count=state.retry_count)
+                )
+                await db.commit()
+
+    async def finish(self, state: TaskState, status: TaskStatus, message: str, order_id: Optional[str] = None):
+        """任务进入终态，立即同步写入数据库"""
+        values = {
+            "status": status,
+            "result_message": message,
+            "retry_count": state.retry_count,
+            "finished_at": datetime.utcnow() + timedelta(hours=8),
+        }
+        if order_id is not None:
+            values["order_id"] = order_id
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Task).where(Task.id == state.task_id).values(**values))
+            await db.commit()
+        self._dirty.discard(state.task_id)
+
+    # ==================== 用户会话 ====================
+
+    async def get_user_cookies(self, user_id: int) -> Optional[Dict[str, str]]:
+        """获取用户登录 cookies（缓存 TASK_USER_RELOAD_INTERVAL 秒）"""
+        cached = self._user_cookies.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < settings.TASK_USER_RELOAD_INTERVAL:
+            return cached[1]
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(User.session_data).where(User.id == user_id))
+            cookies = parse_session_cookies(result.scalar_one_or_none())
+        self._user_cookies[user_id] = (time.monotonic(), cookies)
+        return cookies
+
+    def invalidate_user(self, user_id: int):
+        """用户登录状态变化时清除缓存"""
+        self._user_cookies.pop(user_id, None)
+
+    # ==================== 批量回写 ====================
+
+    def start(self):
+        """启动周期回写"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """停止周期回写并写入剩余变更"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.TASK_STATE_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[调度] 任务状态回写失败: {e}")
+
+    async def flush(self):
+        """将所有变更的重试计数批量写入数据库"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows = [
+            {"id": task_id, "retry_count": self._states[task_id].retry_count}
+            for task_id in dirty
+            if task_id in self._states
+        ]
+        if not rows:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(Task), rows)
+                await db.commit()
+        except Exception:
+            # 写入失败时保留变更，下次重试
+            self._dirty |= dirty
+            raise
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+刷票节拍器
+
+基于最小堆的异步调度循环，替代每个任务一个 APScheduler interval 任务：
+- 新任务立即执行首个节拍（如放票时刻由全局定时启动的任务），
+  之后的节拍按黄金分割序列分配相位，同一间隔内的任务均匀错开，避免集中突发请求
+- 同一任务上一次刷票未结束时跳过本次节拍，不会并发执行
+- 统计节拍延迟（实际开始时间 - 计划时间）
+"""
+
+import math
+import time
+import heapq
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..core.http import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# 黄金分割比例的小数部分，用于生成低差异相位序列
+_GOLDEN_FRACTION = (math.sqrt(5) - 1) / 2
+
+
+@dataclass
+class _TickEntry:
+    """任务节拍信息"""
+    interval: float
+    seq: int  # 每次 add 递增，用于识别堆中的过期条目
+
+
+class TickEngine:
+    """刷票节拍器"""
+
+    def __init__(self, callback: Callable[[int], Awaitable[None]]):
+        """
+        Args:
+            callback: 每个节拍调用的协程函数，参数为任务 ID
+        """
+        self._callback = callback
+        self._heap: List[Tuple[float, int, int]] = []  # (计划时间, seq, task_id)
+        self._entries: Dict[int, _TickEntry] = {}
+        self._running: Dict[int, asyncio.Task] = {}
+        self._seq = 0
+        self._phase_counter = 0
+        # 首个节拍触发后，到第二个节拍的间隔（错开相位）
+        self._phases: Dict[int, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+        # 统计
+        self._lag = LatencyHistogram([1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000])
+        self._ticks = 0
+        self._skipped = 0
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动调度循环"""
+        if self._loop_task is None or self._loop_task.done():
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._run())
+
+    def shutdown(self):
+        """停止调度循环并取消进行中的节拍"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        for tick in list(self._running.values()):
+            tick.cancel()
+        self._heap.clear()
+        self._entries.clear()
+        self._phases.clear()
+
+    # ==================== 任务管理 ====================
+
+    def add(self, task_id: int, interval: float):
+        """
+        添加（或更新）任务节拍
+
+        首个节拍立即触发；第二个节拍在 (0, interval] 内按分配的相位触发，之后每 interval 秒一次
+        """
+        self._seq += 1
+        self._entries[task_id] = _TickEntry(interval=interval, seq=self._seq)
+
+        phase = (self._phase_counter * _GOLDEN_FRACTION) % 1.0
+        self._phase_counter += 1
+        now = time.monotonic()
+        heapq.heappush(self._heap, (now, self._seq, task_id))
+        self._phases[task_id] = (1.0 - phase) * interval
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def remove(self, task_id: int):
+        """移除任务节拍（堆中的条目惰性删除）"""
+        self._entries.pop(task_id, None)
+        self._phases.pop(task_id, None)
+
+    def has(self, task_id: int) -> bool:
+        return task_id in self._entries
+
+    def current_tick(self, task_id: int) -> Optional[asyncio.Task]:
+        """获取任务正在执行的节拍"""
+        return self._running.get(task_id)
+
+    def running_ticks(self) -> List[asyncio.Task]:
+        """获取所有正在执行的节拍"""
+        return list(self._running.values())
+
+    # ==================== 调度循环 ====================
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, seq, task_id = self._heap[0]
+            now = time.monotonic()
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            entry = self._entries.get(task_id)
+            if entry is None or entry.seq != seq:
+                continue  # 已移除或已重新添加
+
+            self._dispatch(task_id, now - due)
+
+            first_gap = self._phases.pop(task_id, None)
+            if first_gap is not None:
+                # 首个节拍之后按分配的相位错开
+                next_due = now + first_gap
+            else:
+                # 保持相位：跳过已错过的周期
+                missed = max(0, math.floor((now - due) / entry.interval))
+                next_due = due + (missed + 1) * entry.interval
+            heapq.heappush(self._heap, (next_due, seq, task_id))
+
+    def _dispatch(self, task_id: int, lag: float):
+        """触发一次节拍"""
+        self._lag.record(lag * 1000)
+
+        previous = self._running.get(task_id)
+        if previous is not None and not previous.done():
+            self._skipped += 1
+            logger.debug(f"[节拍] 任务 {task_id} 上一次刷票尚未结束，跳过本次")
+            return
+
+        self._ticks += 1
+        tick = asyncio.create_task(self._callback(task_id))
+        self._running[task_id] = tick
+        tick.add_done_callback(lambda t: self._on_tick_done(task_id, t))
+
+    def _on_tick_done(self, task_id: int, tick: asyncio.Task):
+        if self._running.get(task_id) is tick:
+            del self._running[task_id]
+        if not tick.cancelled() and tick.exception() is not None:
+            logger.error(f"[节拍] 任务 {task_id} 刷票异常: {tick.exception()}")
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> dict:
+        """获取节拍统计"""
+        return {
+            "tasks": len(self._entries),
+            "running_ticks": len(self._running),
+            "ticks": self._ticks,
+            "skipped_overlaps": self._skipped,
+            "lag": self._lag.snapshot(),
+        }
@@ -1,35 +1,153 @@
+import asyncio
 import base64
 import hashlib
 import hmac
 import json
 import os
 import re
-import threading
 import time
 import urllib.parse
 import smtplib
+import threading
+from collections import deque
+from contextvars import ContextVar
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
-from functools import partial
+from functools import partial, wraps
+from typing import Dict, List, Optional, Tuple
 
-import requests
+import httpx
 import logging
 
 # 统一日志
 logger = logging.getLogger("notify")
-_notify_local = threading.local()
+
+
+class ChannelError(Exception):
+    """渠道拒绝推送（接口返回失败或渠道配置错误），不重试"""
+
+# 当前协程所属的推送渠道（用于日志分组）
+_notify_channel: ContextVar[Optional[str]] = ContextVar("notify_channel", default=None)
+
+# 单个渠道的超时（秒）与失败重试次数（仅网络异常/超时重试）
+CHANNEL_TIMEOUT = 20.0
+CHANNEL_RETRIES = 2
+RETRY_BACKOFF = 2.0
+
+# 在线程中阻塞发送的渠道：取消等待无法中止线程中的发送，不套用渠道超时（依靠套接字超时结束），
+# 超时后也不重试，避免线程中的发送仍然完成时重复推送
+BLOCKING_CHANNELS = frozenset({"smtp"})
+
+# 各渠道每分钟推送条数上限与突发条数（0 表示不限），可按渠道函数名覆盖
+CHANNEL_RATE_PER_MINUTE = 20.0
+CHANNEL_BURST = 5
+CHANNEL_RATE_OVERRIDES: Dict[str, float] = {}
+
+# 各渠道的异步 HTTP 客户端（长连接复用），按 (渠道, 代理地址) 区分
+_clients: Dict[Tuple[Optional[str], Optional[str]], httpx.AsyncClient] = {}
+
+# 企业微信 access_token 缓存：(接口地址, corpid, corpsecret) -> (token, 过期时间 monotonic)
+_wecom_tokens: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+WECOM_TOKEN_MARGIN = 300  # 提前刷新的秒数
+# access_token 无效或过期的错误码
+WECOM_TOKEN_ERRCODES = (40001, 40014, 42001)
+
+# 复用的 SMTP 连接：(服务器, SSL, 邮箱) -> [连接, 锁]
+_smtp_connections: Dict[Tuple[str, str, str], list] = {}
+
+# 预取的一言，推送时直接取用，取空时返回空字符串并在后台补充
+HITOKOTO_POOL_SIZE = 5
+_hitokoto_pool: deque = deque(maxlen=HITOKOTO_POOL_SIZE)
+_hitokoto_refill: Optional[asyncio.Task] = None
+
+
+def _http(proxy: Optional[str] = None) -> httpx.AsyncClient:
+    key = (_notify_channel.get(), proxy)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(proxy=proxy, timeout=15, follow_redirects=True)
+        _clients[key] = client
+    return client
+
+
+async def close_clients():
+    """关闭共享的 HTTP 客户端（并停止一言预取）"""
+    global _hitokoto_refill
+    if _hitokoto_refill is not None and not _hitokoto_refill.done():
+        _hitokoto_refill.cancel()
+        await asyncio.gather(_hitokoto_refill, return_exceptions=True)
+    _hitokoto_refill = None
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+    connections = [conn for conn, _ in _smtp_connections.values()]
+    _smtp_connections.clear()
+    if connections:
+        await asyncio.to_thread(_close_smtp_connections, connections)
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, wait: bool = True):
+        """
+        取一个令牌
+
+        Args:
+            wait: 为 False 时不等待，令牌不足也立即放行（记为欠额，推迟后续普通推送）
+        """
+        while True:
+            self._refill()
+            if self.tokens >= 1 or not wait:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def configure_rate_limit(rate_per_minute: float, burst: int, overrides: Optional[Dict[str, float]] = None):
+    """设置各渠道的推送限速（已创建的令牌桶按新配置重建）"""
+    global CHANNEL_RATE_PER_MINUTE, CHANNEL_BURST, CHANNEL_RATE_OVERRIDES
+    CHANNEL_RATE_PER_MINUTE = rate_per_minute
+    CHANNEL_BURST = burst
+    CHANNEL_RATE_OVERRIDES = dict(overrides or {})
+    _buckets.clear()
+
+
+def _bucket(name: str) -> Optional[TokenBucket]:
+    rate = CHANNEL_RATE_OVERRIDES.get(name, CHANNEL_RATE_PER_MINUTE)
+    if rate <= 0:
+        return None
+    bucket = _buckets.get(name)
+    if bucket is None:
+        bucket = _buckets[name] = TokenBucket(rate, CHANNEL_BURST)
+    return bucket
 
 
 def channel(name: str):
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            prev = getattr(_notify_local, "channel", None)
-            _notify_local.channel = name
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _notify_channel.set(name)
             try:
-                return func(*args, **kwargs)
+                return await func(*args, **kwargs)
             finally:
-                _notify_local.channel = prev
+                _notify_channel.reset(token)
         return wrapper
     return decorator
 
@@ -45,7 +163,7 @@ def _notify_log(message: str):
         level = logging.ERROR
     elif "警告" in text or "warning" in text:
         level = logging.WARNING
-    ch = getattr(_notify_local, "channel", None)
+    ch = _notify_channel.get()
     if ch:
         logging.getLogger(f"notify.{ch}").log(level, text)
     else:
@@ -177,7 +295,7 @@ for k in push_config:
 
 
 @channel("bark")
-def bark(title: str, content: str, config=None) -> None:
+async def bark(title: str, content: str, config=None) -> None:
     """
     使用 bark 推送消息。
     """
@@ -212,18 +330,18 @@ def bark(title: str, content: str, config=None) -> None:
     ):
         data[bark_params.get(pair[0])] = pair[1]
     headers = {"Content-Type": "application/json;charset=utf-8"}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    response = (await _http().post(
+        url=url, content=json.dumps(data), headers=headers, timeout=15
+    )).json()
 
     if response["code"] == 200:
         print("bark 推送成功！")
     else:
-        print("bark 推送失败！")
+        raise ChannelError("bark 推送失败！")
 
 
 @channel("console")
-def console(title: str, content: str, config=None) -> None:
+async def console(title: str, content: str, config=None) -> None:
     """
     使用 控制台 推送消息。
     """
@@ -231,7 +349,7 @@ def console(title: str, content: str, config=None) -> None:
 
 
 @channel("dingding")
-def dingding_bot(title: str, content: str, config=None) -> None:
+async def dingding_bot(title: str, content: str, config=None) -> None:
     """
     使用 钉钉机器人 推送消息。
     """
@@ -251,18 +369,18 @@ def dingding_bot(title: str, content: str, config=None) -> None:
     url = f'https://oapi.dingtalk.com/robot/send?access_token={cfg.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    response = (await _http().post(
+        url=url, content=json.dumps(data), headers=headers, timeout=15
+    )).json()
 
     if not response["errcode"]:
         print("钉钉机器人 推送成功！")
     else:
-        print("钉钉机器人 推送失败！")
+        raise ChannelError("钉钉机器人 推送失败！")
 
 
 @channel("feishu")
-def feishu_bot(title: str, content: str, config=None) -> None:
+async def feishu_bot(title: str, content: str, config=None) -> None:
     """
     使用 飞书机器人 推送消息。
     """
@@ -273,16 +391,16 @@ def feishu_bot(title: str, content: str, config=None) -> None:
 
     url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{cfg.get("FSKEY")}'
     data = {"msg_type": "text", "content": {"text": f"{title}\n\n{content}"}}
-    response = requests.post(url, data=json.dumps(data), timeout=15).json()
+    response = (await _http().post(url, content=json.dumps(data), timeout=15)).json()
 
     if response.get("StatusCode") == 0 or response.get("code") == 0:
         print("飞书 推送成功！")
     else:
-        print("飞书 推送失败！错误信息如下：\n", response)
+        raise ChannelError(f"飞书 推送失败！错误信息如下：\n{response}")
 
 
 @channel("go_cqhttp")
-def go_cqhttp(title: str, content: str, config=None) -> None:
+async def go_cqhttp(title: str, content: str, config=None) -> None:
     """
     使用 go_cqhttp 推送消息。
     """
@@ -292,16 +410,16 @@ def go_cqhttp(title: str, content: str, config=None) -> None:
     print("go-cqhttp 服务启动")
 
     url = f'{cfg.get("GOBOT_URL")}?access_token={cfg.get("GOBOT_TOKEN")}&{cfg.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
-    response = requests.get(url, timeout=15).json()
+    response = (await _http().get(url, timeout=15)).json()
 
     if response["status"] == "ok":
         print("go-cqhttp 推送成功！")
     else:
-        print("go-cqhttp 推送失败！")
+        raise ChannelError("go-cqhttp 推送失败！")
 
 
 @channel("gotify")
-def gotify(title: str, content: str, config=None) -> None:
+async def gotify(title: str, content: str, config=None) -> None:
     """
     使用 gotify 推送消息。
     """
@@ -316,16 +434,16 @@ def gotify(title: str, content: str, config=None) -> None:
         "message": content,
         "priority": cfg.get("GOTIFY_PRIORITY"),
     }
-    response = requests.post(url, data=data, timeout=15).json()
+    response = (await _http().post(url, data=data, timeout=15)).json()
 
     if response.get("id"):
         print("gotify 推送成功！")
     else:
-        print("gotify 推送失败！")
+        raise ChannelError("gotify 推送失败！")
 
 
 @channel("igot")
-def iGot(title: str, content: str, config=None) -> None:
+async def iGot(title: str, content: str, config=None) -> None:
     """
     使用 iGot 推送消息。
     """
@@ -337,16 +455,16 @@ def iGot(title: str, content: str, config=None) -> None:
     url = f'https://push.hellyw.com/{cfg.get("IGOT_PUSH_KEY")}'
     data = {"title": title, "content": content}
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(url, data=data, headers=headers, timeout=15).json()
+    response = (await _http().post(url, data=data, headers=headers, timeout=15)).json()
 
     if response["ret"] == 0:
         print("iGot 推送成功！")
     else:
-        print(f'iGot 推送失败！{response["errMsg"]}')
+        raise ChannelError(f'iGot 推送失败！{response["errMsg"]}')
 
 
 @channel("serverj")
-def serverJ(title: str, content: str, config=None) -> None:
+async def serverJ(title: str, content: str, config=None) -> None:
     """
     通过 serverJ 推送消息。
     """
@@ -364,16 +482,16 @@ def serverJ(title: str, content: str, config=None) -> None:
     else:
         url = f'https://sctapi.ftqq.com/{cfg.get("PUSH_KEY")}.send'
 
-    response = requests.post(url, data=data, timeout=15).json()
+    response = (await _http().post(url, data=data, timeout=15)).json()
 
     if response.get("errno") == 0 or response.get("code") == 0:
         print("serverJ 推送成功！")
     else:
-        print(f'serverJ 推送失败！错误码：{response["message"]}')
+        raise ChannelError(f'serverJ 推送失败！错误码：{response["message"]}')
 
 
 @channel("pushdeer")
-def pushdeer(title: str, content: str, config=None) -> None:
+async def pushdeer(title: str, content: str, config=None) -> None:
     """
     通过PushDeer 推送消息
     """
@@ -391,16 +509,16 @@ def pushdeer(title: str, content: str, config=None) -> None:
     if cfg.get("DEER_URL"):
         url = cfg.get("DEER_URL")
 
-    response = requests.post(url, data=data, timeout=15).json()
+    response = (await _http().post(url, data=data, timeout=15)).json()
 
     if len(response.get("content").get("result")) > 0:
         print("PushDeer 推送成功！")
     else:
-        print("PushDeer 推送失败！错误信息：", response)
+        raise ChannelError(f"PushDeer 推送失败！错误信息：{response}")
 
 
 @channel("chat")
-def chat(title: str, content: str, config=None) -> None:
+async def chat(title: str, content: str, config=None) -> None:
     """
     通过Chat 推送消息
     """
@@ -410,16 +528,16 @@ def chat(title: str, content: str, config=None) -> None:
     print("chat 服务启动")
     data = "payload=" + json.dumps({"text": title + "\n" + content})
     url = cfg.get("CHAT_URL") + cfg.get("CHAT_TOKEN")
-    response = requests.post(url, data=data, timeout=15)
+    response = await _http().post(url, content=data, timeout=15)
 
     if response.status_code == 200:
         print("Chat 推送成功！")
     else:
-        print("Chat 推送失败！错误信息：", response)
+        raise ChannelError(f"Chat 推送失败！错误信息：{response}")
 
 
 @channel("pushplus")
-def pushplus_bot(title: str, content: str, config=None) -> None:
+async def pushplus_bot(title: str, content: str, config=None) -> None:
     """
     通过 pushplus 推送消息。
     """
@@ -442,7 +560,7 @@ def pushplus_bot(title: str, content: str, config=None) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers, timeout=15).json()
+    response = (await _http().post(url=url, content=body, headers=headers, timeout=15)).json()
 
     code = response["code"]
     if code == 200:
@@ -451,22 +569,22 @@ def pushplus_bot(title: str, content: str, config=None) -> None:
             "注意：请求成功并不代表推送成功，如未收到消息，请到pushplus官网使用流水号查询推送最终结果"
         )
     elif code == 900 or code == 903 or code == 905 or code == 999:
-        print(response["msg"])
+        raise ChannelError(f'PUSHPLUS 推送失败！{response["msg"]}')
 
     else:
         url_old = "http://pushplus.hxtrip.com/send"
         headers["Accept"] = "application/json"
-        response = requests.post(url=url_old, data=body, headers=headers, timeout=15).json()
+        response = (await _http().post(url=url_old, content=body, headers=headers, timeout=15)).json()
 
         if response["code"] == 200:
             print("PUSHPLUS(hxtrip) 推送成功！")
 
         else:
-            print("PUSHPLUS 推送失败！")
+            raise ChannelError("PUSHPLUS 推送失败！")
 
 
 @channel("weplus")
-def weplus_bot(title: str, content: str, config=None) -> None:
+async def weplus_bot(title: str, content: str, config=None) -> None:
     """
     通过 微加机器人 推送消息。
     """
@@ -490,16 +608,16 @@ def weplus_bot(title: str, content: str, config=None) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers, timeout=15).json()
+    response = (await _http().post(url=url, content=body, headers=headers, timeout=15)).json()
 
     if response["code"] == 200:
         print("微加机器人 推送成功！")
     else:
-        print("微加机器人 推送失败！")
+        raise ChannelError("微加机器人 推送失败！")
 
 
 @channel("qmsg")
-def qmsg_bot(title: str, content: str, config=None) -> None:
+async def qmsg_bot(title: str, content: str, config=None) -> None:
     """
     使用 qmsg 推送消息。
     """
@@ -509,17 +627,17 @@ def qmsg_bot(title: str, content: str, config=None) -> None:
     print("qmsg 服务启动")
 
     url = f'https://qmsg.zendee.cn/{cfg.get("QMSG_TYPE")}/{cfg.get("QMSG_KEY")}'
-    payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'.encode("utf-8")}
-    response = requests.post(url=url, params=payload, timeout=15).json()
+    payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'}
+    response = (await _http().post(url=url, params=payload, timeout=15)).json()
 
     if response["code"] == 0:
         print("qmsg 推送成功！")
     else:
-        print(f'qmsg 推送失败！{response["reason"]}')
+        raise ChannelError(f'qmsg 推送失败！{response["reason"]}')
 
 
 @channel("wecom_app")
-def wecom_app(title: str, content: str, config=None) -> None:
+async def wecom_app(title: str, content: str, config=None) -> None:
     """
     通过 企业微信 APP 推送消息。
     """
@@ -528,8 +646,7 @@ def wecom_app(title: str, content: str, config=None) -> None:
         return
     QYWX_AM_AY = re.split(",", cfg.get("QYWX_AM"))
     if 4 < len(QYWX_AM_AY) > 5:
-        print("QYWX_AM 设置错误!!")
-        return
+        raise ChannelError("QYWX_AM 设置错误!!")
     print("企业微信 APP 服务启动")
 
     corpid = QYWX_AM_AY[0]
@@ -544,14 +661,14 @@ def wecom_app(title: str, content: str, config=None) -> None:
     # 如果没有配置 media_id 默认就以 text 方式发送
     if not media_id:
         message = title + "\n\n" + content
-        response = wx.send_text(message, touser)
+        response = await wx.send_text(message, touser)
     else:
-        response = wx.send_mpnews(title, content, media_id, touser)
+        response = await wx.send_mpnews(title, content, media_id, touser)
 
     if response == "ok":
         print("企业微信推送成功！")
     else:
-        print("企业微信推送失败！错误信息如下：\n", response)
+        raise ChannelError(f"企业微信推送失败！错误信息如下：\n{response}")
 
 
 class WeCom:
@@ -564,20 +681,43 @@ class WeCom:
         if cfg.get("QYWX_ORIGIN"):
             self.ORIGIN = cfg.get("QYWX_ORIGIN")
 
-    def get_access_token(self):
+    async def get_access_token(self, refresh=False):
+        """获取 access_token，有效期内复用缓存"""
+        key = (self.ORIGIN, self.CORPID, self.CORPSECRET)
+        cached = _wecom_tokens.get(key)
+        if cached and not refresh and cached[1] > time.monotonic():
+            return cached[0]
+
         url = f"{self.ORIGIN}/cgi-bin/gettoken"
         values = {
             "corpid": self.CORPID,
             "corpsecret": self.CORPSECRET,
         }
-        req = requests.post(url, params=values, timeout=15)
+        req = await _http().post(url, params=values, timeout=15)
         data = json.loads(req.text)
+        expires_in = int(data.get("expires_in", 7200))
+        _wecom_tokens[key] = (
+            data["access_token"],
+            time.monotonic() + max(expires_in - WECOM_TOKEN_MARGIN, 0),
+        )
         return data["access_token"]
 
-    def send_text(self, message, touser="@all"):
-        send_url = (
-            f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-        )
+    async def _send_message(self, send_values):
+        """发送应用消息，access_token 失效时刷新后重发一次"""
+        send_msges = bytes(json.dumps(send_values), "utf-8")
+        refresh = False
+        while True:
+            send_url = (
+                f"{self.ORIGIN}/cgi-bin/message/send?access_token={await self.get_access_token(refresh)}"
+            )
+            respone = await _http().post(send_url, content=send_msges, timeout=15)
+            respone = respone.json()
+            if respone.get("errcode") in WECOM_TOKEN_ERRCODES and not refresh:
+                refresh = True
+                continue
+            return respone["errmsg"]
+
+    async def send_text(self, message, touser="@all"):
         send_values = {
             "touser": touser,
             "msgtype": "text",
@@ -585,15 +725,9 @@ class WeCom:
             "text": {"content": message},
             "safe": "0",
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges, timeout=15)
-        respone = respone.json()
-        return respone["errmsg"]
+        return await self._send_message(send_values)
 
-    def send_mpnews(self, title, message, media_id, touser="@all"):
-        send_url = (
-            f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-        )
+    async def send_mpnews(self, title, message, media_id, touser="@all"):
         send_values = {
             "touser": touser,
             "msgtype": "mpnews",
@@ -611,14 +745,11 @@ class WeCom:
                 ]
             },
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges, timeout=15)
-        respone = respone.json()
-        return respone["errmsg"]
+        return await self._send_message(send_values)
 
 
 @channel("wecom_bot")
-def wecom_bot(title: str, content: str, config=None) -> None:
+async def wecom_bot(title: str, content: str, config=None) -> None:
     """
     通过 企业微信机器人 推送消息。
     """
@@ -634,18 +765,18 @@ def wecom_bot(title: str, content: str, config=None) -> None:
     url = f"{origin}/cgi-bin/webhook/send?key={cfg.get('QYWX_KEY')}"
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    response = (await _http().post(
+        url=url, content=json.dumps(data), headers=headers, timeout=15
+    )).json()
 
     if response["errcode"] == 0:
         print("企业微信机器人推送成功！")
     else:
-        print("企业微信机器人推送失败！")
+        raise ChannelError("企业微信机器人推送失败！")
 
 
 @channel("telegram")
-def telegram_bot(title: str, content: str, config=None) -> None:
+async def telegram_bot(title: str, content: str, config=None) -> None:
     """
     使用 telegram 机器人 推送消息。
     """
@@ -666,7 +797,7 @@ def telegram_bot(title: str, content: str, config=None) -> None:
         "text": f"{title}\n\n{content}",
         "disable_web_page_preview": "true",
     }
-    proxies = None
+    proxy = None
     if cfg.get("TG_PROXY_HOST") and cfg.get("TG_PROXY_PORT"):
         if cfg.get("TG_PROXY_AUTH") is not None and "@" not in cfg.get(
             "TG_PROXY_HOST"
@@ -676,22 +807,21 @@ def telegram_bot(title: str, content: str, config=None) -> None:
                 + "@"
                 + cfg.get("TG_PROXY_HOST")
             )
-        proxyStr = "http://{}:{}".format(
+        proxy = "http://{}:{}".format(
             cfg.get("TG_PROXY_HOST"), cfg.get("TG_PROXY_PORT")
         )
-        proxies = {"http": proxyStr, "https": proxyStr}
-    response = requests.post(
-        url=url, headers=headers, params=payload, proxies=proxies, timeout=15
-    ).json()
+    response = (await _http(proxy).post(
+        url=url, headers=headers, params=payload, timeout=15
+    )).json()
 
     if response["ok"]:
         print("tg 推送成功！")
     else:
-        print("tg 推送失败！")
+        raise ChannelError("tg 推送失败！")
 
 
 @channel("aibotk")
-def aibotk(title: str, content: str, config=None) -> None:
+async def aibotk(title: str, content: str, config=None) -> None:
     """
     使用 智能微秘书 推送消息。
     """
@@ -720,16 +850,16 @@ def aibotk(title: str, content: str, config=None) -> None:
         }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers, timeout=15).json()
+    response = (await _http().post(url=url, content=body, headers=headers, timeout=15)).json()
     print(response)
     if response["code"] == 0:
         print("智能微秘书 推送成功！")
     else:
-        print(f'智能微秘书 推送失败！{response["error"]}')
+        raise ChannelError(f'智能微秘书 推送失败！{response["error"]}')
 
 
 @channel("smtp")
-def smtp(title: str, content: str, config=None) -> None:
+async def smtp(title: str, content: str, config=None) -> None:
     """
     使用 SMTP 邮件 推送消息。
     """
@@ -759,28 +889,58 @@ def smtp(title: str, content: str, config=None) -> None:
     )
     message["Subject"] = Header(title, "utf-8")
 
-    try:
-        smtp_server = (
-            smtplib.SMTP_SSL(cfg.get("SMTP_SERVER"))
-            if cfg.get("SMTP_SSL") == "true"
-            else smtplib.SMTP(cfg.get("SMTP_SERVER"))
-        )
-        smtp_server.login(
-            cfg.get("SMTP_EMAIL"), cfg.get("SMTP_PASSWORD")
-        )
-        smtp_server.sendmail(
-            cfg.get("SMTP_EMAIL"),
-            cfg.get("SMTP_EMAIL"),
-            message.as_bytes(),
-        )
-        smtp_server.close()
-        print("SMTP 邮件 推送成功！")
-    except Exception as e:
-        print(f"SMTP 邮件 推送失败！{e}")
+    # smtplib 为阻塞调用，放到线程中执行，不阻塞事件循环；发送异常由 _deliver 记录
+    await asyncio.to_thread(_smtp_sendmail, cfg, message.as_bytes())
+    print("SMTP 邮件 推送成功！")
+
+
+def _smtp_connect(cfg):
+    smtp_server = (
+        smtplib.SMTP_SSL(cfg.get("SMTP_SERVER"), timeout=15)
+        if cfg.get("SMTP_SSL") == "true"
+        else smtplib.SMTP(cfg.get("SMTP_SERVER"), timeout=15)
+    )
+    smtp_server.login(
+        cfg.get("SMTP_EMAIL"), cfg.get("SMTP_PASSWORD")
+    )
+    return smtp_server
+
+
+def _smtp_sendmail(cfg, message: bytes):
+    """
+    通过复用的 SMTP 连接发送邮件（在线程中执行）
+
+    同一服务器的发送串行进行；连接已被服务器断开时重新登录后重发一次
+    """
+    key = (cfg.get("SMTP_SERVER"), cfg.get("SMTP_SSL"), cfg.get("SMTP_EMAIL"))
+    entry = _smtp_connections.setdefault(key, [None, threading.Lock()])
+    with entry[1]:
+        for attempt in range(2):
+            if entry[0] is None:
+                entry[0] = _smtp_connect(cfg)
+            try:
+                entry[0].sendmail(cfg.get("SMTP_EMAIL"), cfg.get("SMTP_EMAIL"), message)
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused, OSError):
+                # 空闲连接被服务器关闭（SMTPSenderRefused 多为会话超时），重新连接
+                _close_smtp_connections([entry[0]])
+                entry[0] = None
+                if attempt:
+                    raise
+
+
+def _close_smtp_connections(connections):
+    for conn in connections:
+        if conn is None:
+            continue
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
 
 
 @channel("pushme")
-def pushme(title: str, content: str, config=None) -> None:
+async def pushme(title: str, content: str, config=None) -> None:
     """
     使用 PushMe 推送消息。
     """
@@ -801,16 +961,16 @@ def pushme(title: str, content: str, config=None) -> None:
         "date": cfg.get("date") if cfg.get("date") else "",
         "type": cfg.get("type") if cfg.get("type") else "",
     }
-    response = requests.post(url, data=data, timeout=15)
+    response = await _http().post(url, data=data, timeout=15)
 
     if response.status_code == 200 and response.text == "success":
         print("PushMe 推送成功！")
     else:
-        print(f"PushMe 推送失败！{response.status_code} {response.text}")
+        raise ChannelError(f"PushMe 推送失败！{response.status_code} {response.text}")
 
 
 @channel("chronocat")
-def chronocat(title: str, content: str, config=None) -> None:
+async def chronocat(title: str, content: str, config=None) -> None:
     """
     使用 CHRONOCAT 推送消息。
     """
@@ -833,6 +993,7 @@ def chronocat(title: str, content: str, config=None) -> None:
         "Authorization": f'Bearer {cfg.get("CHRONOCAT_TOKEN")}',
     }
 
+    failed = 0
     for chat_type, ids in [(1, user_ids), (2, group_ids)]:
         if not ids:
             continue
@@ -846,7 +1007,7 @@ def chronocat(title: str, content: str, config=None) -> None:
                     }
                 ],
             }
-            response = requests.post(url, headers=headers, data=json.dumps(data), timeout=15)
+            response = await _http().post(url, headers=headers, content=json.dumps(data), timeout=15)
             if response.status_code == 200:
                 if chat_type == 1:
                     print(f"QQ个人消息:{ids}推送成功！")
@@ -857,10 +1018,13 @@ def chronocat(title: str, content: str, config=None) -> None:
                     print(f"QQ个人消息:{ids}推送失败！")
                 else:
                     print(f"QQ群消息:{ids}推送失败！")
+                failed += 1
+    if failed:
+        raise ChannelError(f"CHRONOCAT 推送失败！{failed} 条消息未送达")
 
 
 @channel("ntfy")
-def ntfy(title: str, content: str, config=None) -> None:
+async def ntfy(title: str, content: str, config=None) -> None:
     """
     通过 Ntfy 推送消息
     """
@@ -888,15 +1052,15 @@ def ntfy(title: str, content: str, config=None) -> None:
     headers = {"Title": encoded_title, "Priority": priority}  # 使用编码后的 title
 
     url = cfg.get("NTFY_URL") + "/" + cfg.get("NTFY_TOPIC")
-    response = requests.post(url, data=data, headers=headers, timeout=15)
+    response = await _http().post(url, content=data, headers=headers, timeout=15)
     if response.status_code == 200:  # 使用 response.status_code 进行检查
         print("Ntfy 推送成功！")
     else:
-        print("Ntfy 推送失败！错误信息：", response.text)
+        raise ChannelError(f"Ntfy 推送失败！错误信息：{response.text}")
 
 
 @channel("wxpusher")
-def wxpusher_bot(title: str, content: str, config=None) -> None:
+async def wxpusher_bot(title: str, content: str, config=None) -> None:
     """
     通过 wxpusher 推送消息。
     支持的环境变量:
@@ -929,8 +1093,7 @@ def wxpusher_bot(title: str, content: str, config=None) -> None:
 
     # topic_ids uids 至少有一个
     if not topic_ids and not uids:
-        print("wxpusher 服务的 WXPUSHER_TOPIC_IDS 和 WXPUSHER_UIDS 至少设置一个!!")
-        return
+        raise ChannelError("wxpusher 服务的 WXPUSHER_TOPIC_IDS 和 WXPUSHER_UIDS 至少设置一个!!")
 
     print("wxpusher 服务启动")
 
@@ -945,16 +1108,16 @@ def wxpusher_bot(title: str, content: str, config=None) -> None:
     }
 
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, json=data, headers=headers, timeout=15).json()
+    response = (await _http().post(url=url, json=data, headers=headers, timeout=15)).json()
 
     if response.get("code") == 1000:
         print("wxpusher 推送成功！")
     else:
-        print(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
+        raise ChannelError(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
 
 
 @channel("mediasaber")
-def mediasaber_bot(title: str, content: str, config=None) -> None:
+async def mediasaber_bot(title: str, content: str, config=None) -> None:
     """
     使用 Media Saber 推送消息。
     """
@@ -979,20 +1142,17 @@ def mediasaber_bot(title: str, content: str, config=None) -> None:
         "apiKey": cfg.get("MEDIASABER_APIKEY")
     }
     
-    try:
-        response = requests.post(
-            url=url, 
-            data=json.dumps(data), 
-            headers=headers, 
-            timeout=15
-        )
-        
-        if response.status_code == 200:
-            print("Media Saber 推送成功！")
-        else:
-            print(f"Media Saber 推送失败！状态码：{response.status_code}，响应：{response.text}")
-    except Exception as e:
-        print(f"Media Saber 推送失败！错误：{str(e)}")
+    response = await _http().post(
+        url=url, 
+        content=json.dumps(data), 
+        headers=headers, 
+        timeout=15
+    )
+    
+    if response.status_code == 200:
+        print("Media Saber 推送成功！")
+    else:
+        raise ChannelError(f"Media Saber 推送失败！状态码：{response.status_code}，响应：{response.text}")
 
 
 def parse_headers(headers):
@@ -1069,7 +1229,7 @@ def parse_body(body, content_type, value_format_fn=None):
 
 
 @channel("webhook")
-def custom_notify(title: str, content: str, config=None) -> None:
+async def custom_notify(title: str, content: str, config=None) -> None:
     """
     通过 自定义通知 推送消息。
     """
@@ -1086,8 +1246,7 @@ def custom_notify(title: str, content: str, config=None) -> None:
     WEBHOOK_HEADERS = cfg.get("WEBHOOK_HEADERS")
 
     if "$title" not in WEBHOOK_URL and "$title" not in WEBHOOK_BODY:
-        print("请求头或者请求体中必须包含 $title 和 $content")
-        return
+        raise ChannelError("请求头或者请求体中必须包含 $title 和 $content")
 
     headers = parse_headers(WEBHOOK_HEADERS)
     # 如未显式提供 Content-Type，则使用配置中的类型
@@ -1104,17 +1263,17 @@ def custom_notify(title: str, content: str, config=None) -> None:
     formatted_url = WEBHOOK_URL.replace(
         "$title", urllib.parse.quote_plus(title)
     ).replace("$content", urllib.parse.quote_plus(content))
-    response = requests.request(
-        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=15, data=body
+    response = await _http().request(
+        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=15, content=body
     )
 
     if response.status_code == 200:
         print("自定义通知推送成功！")
     else:
-        print(f"自定义通知推送失败！{response.status_code} {response.text}")
+        raise ChannelError(f"自定义通知推送失败！{response.status_code} {response.text}")
 
 
-def one() -> str:
+async def one() -> str:
     """
     获取一条一言。
     :return:
@@ -1127,7 +1286,7 @@ def one() -> str:
 
     for url in urls:
         try:
-            response = requests.get(url, timeout=15)
+            response = await _http().get(url, timeout=15)
             content = ""
             source = "网络"
 
@@ -1152,6 +1311,61 @@ def one() -> str:
     return ""
 
 
+def prefetch_hitokoto():
+    """在后台补充一言预取池（需在事件循环中调用）"""
+    global _hitokoto_refill
+    if len(_hitokoto_pool) >= HITOKOTO_POOL_SIZE:
+        return
+    if _hitokoto_refill is None or _hitokoto_refill.done():
+        _hitokoto_refill = asyncio.get_running_loop().create_task(_refill_hitokoto())
+
+
+async def _refill_hitokoto():
+    while len(_hitokoto_pool) < HITOKOTO_POOL_SIZE:
+        quote = await one()
+        if not quote:
+            # 所有来源均不可用，下次取用时再尝试
+            return
+        _hitokoto_pool.append(quote)
+
+
+def take_hitokoto() -> str:
+    """
+    从预取池取一条一言，不发起网络请求
+
+    池为空时返回空字符串，并在后台补充
+    """
+    quote = _hitokoto_pool.popleft() if _hitokoto_pool else ""
+    prefetch_hitokoto()
+    return quote
+
+
+class ChannelPlan:
+    """
+    预先编译的推送计划：已启用的渠道函数及其配置
+
+    通知配置变更时构建一次，之后每次推送直接使用
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.functions: List[partial] = add_notify_function(config)
+        self.hitokoto = config.get("HITOKOTO") != "false"
+
+    def __bool__(self):
+        return bool(self.functions)
+
+
+def compile_plan(config: dict, ignore_default_config: bool = True) -> ChannelPlan:
+    """根据通知配置构建推送计划"""
+    effective_config = push_config.copy()
+    if ignore_default_config:
+        effective_config = dict(config)
+    else:
+        effective_config.update(config)
+    return ChannelPlan(effective_config)
+
+
 def add_notify_function(config=None):
     notify_function = []
     cfg = config or push_config
@@ -1233,36 +1447,95 @@ def add_notify_function(config=None):
     return notify_function
 
 
-def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
-    effective_config = push_config.copy()
-    if ignore_default_config:
-        effective_config = kwargs
-    else:
-        effective_config.update(kwargs)
+async def _deliver(mode, title: str, content: str, timeout: float, retries: int, urgent: bool = False) -> bool:
+    """
+    推送到单个渠道：按渠道限速，超时或网络异常时退避重试
+
+    渠道函数在接口返回失败时抛出 ChannelError，正常返回才视为推送成功；
+    BLOCKING_CHANNELS 中的渠道不套用超时、不重试；urgent 的推送不等待限速令牌
+    """
+    name = mode.func.__name__
+    bucket = _bucket(name)
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            await bucket.acquire(wait=not urgent)
+        try:
+            if name in BLOCKING_CHANNELS:
+                await mode(title, content)
+            else:
+                await asyncio.wait_for(mode(title, content), timeout=timeout)
+            return True
+        except (asyncio.TimeoutError, httpx.TransportError) as e:
+            if attempt < retries and name not in BLOCKING_CHANNELS:
+                logger.warning(f"{name} 推送超时或网络异常，{RETRY_BACKOFF * (attempt + 1):.0f} 秒后重试: {e!r}")
+                await asyncio.sleep(RETRY_BACKOFF * (attempt + 1))
+                continue
+            logger.error(f"{name} 推送失败（已重试 {retries} 次）: {e!r}")
+        except ChannelError as e:
+            logger.error(str(e))
+        except Exception as e:
+            logger.error(f"{name} 推送失败: {e!r}")
+        return False
+    return False
+
+
+async def send_async(
+    title: str,
+    content: str,
+    ignore_default_config: bool = False,
+    timeout: float = CHANNEL_TIMEOUT,
+    retries: int = CHANNEL_RETRIES,
+    plan: Optional[ChannelPlan] = None,
+    urgent: bool = False,
+    **kwargs
+) -> Dict[str, bool]:
+    """
+    并发推送到所有已配置的渠道
+
+    Args:
+        plan: 预先构建的推送计划（compile_plan），未传入时按本次配置构建
+        urgent: 紧急推送（如抢票成功），不等待渠道限速
+
+    Returns:
+        渠道函数名 -> 是否推送成功
+    """
+    if plan is None:
+        plan = compile_plan(kwargs, ignore_default_config)
 
     if not content:
         print(f"{title} 推送内容为空！")
-        return
+        return {}
 
     # 根据标题跳过一些消息推送，环境变量：SKIP_PUSH_TITLE 用回车分隔
     skipTitle = os.getenv("SKIP_PUSH_TITLE")
     if skipTitle:
         if title in re.split("\n", skipTitle):
             print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
-            return
+            return {}
 
-    hitokoto = effective_config.get("HITOKOTO")
-    content += "\n\n" + one() if hitokoto != "false" else ""
+    if plan.hitokoto:
+        quote = take_hitokoto()
+        if quote:
+            content += "\n\n" + quote
 
-    notify_function = add_notify_function(effective_config)
+    notify_function = plan.functions
     # partial objects have a 'func' attribute that points to the original function
     # and the original function has __name__
-    ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.func.__name__)
-        for mode in notify_function
-    ]
-    [t.start() for t in ts]
-    [t.join() for t in ts]
+    results = await asyncio.gather(
+        *(_deliver(mode, title, content, timeout, retries, urgent) for mode in notify_function)
+    )
+    return {mode.func.__name__: ok for mode, ok in zip(notify_function, results)}
+
+
+def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
+    """同步推送（命令行使用；事件循环中请使用 send_async）"""
+    async def _send():
+        try:
+            return await send_async(title, content, ignore_default_config, **kwargs)
+        finally:
+            await close_clients()
+
+    return asyncio.run(_send())
 
 
 def main():
@@ -21,8 +21,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.core.config import get_settings, ensure_directories
 from app.core.logging import setup_logging
 from app.core.database import init_db, close_db
-from app.api import auth, trains, tasks, users, config
+from app.core.http import close_shared_transport
+from app.services.order_session import get_order_session_pool
+from app.services.query_service import StationManager
+from app.api import auth, trains, tasks, users, config, metrics
 from app.tasks.scheduler import get_scheduler
+from app.utils import notify
 
 settings = get_settings()
 
@@ -40,14 +44,20 @@ async def lifespan(app: FastAPI):
     # 初始化日志系统
     setup_logging()
     
+    # 预加载车站数据并建立搜索索引（避免首次查询时在事件循环中构建）
+    StationManager().load_from_file(settings.STATION_FILE)
+    
     # 初始化数据库
     await init_db()
     
-    # 启动调度器
+    # 启动调度器（分离部署时由独立的 worker.py 进程调度）
     scheduler = get_scheduler()
-    scheduler.start()
-    # 恢复运行中的任务
-    await scheduler.resume_tasks()
+    if settings.SCHEDULER_EMBEDDED:
+        scheduler.start()
+        # 恢复运行中的任务
+        await scheduler.resume_tasks()
+    else:
+        print("[启动] 调度器运行在独立的 worker 进程中 (python worker.py)")
     
     print("[启动] 服务启动成功!")
     print(f"[启动] API 文档: http://localhost:8000/docs")
@@ -59,7 +69,14 @@ async def lifespan(app: FastAPI):
     print("\n[关闭] 正在关闭服务...")
     
     # 关闭调度器
-    scheduler.shutdown()
+    await scheduler.shutdown()
+    
+    # 关闭下单会话和 12306 连接池
+    await get_order_session_pool().close()
+    await close_shared_transport()
+    
+    # 关闭通知推送连接（测试通知接口也会使用）
+    await notify.close_clients()
     
     # 关闭数据库连接
     await close_db()
@@ -119,6 +136,7 @@ app.include_router(trains.router, prefix=settings.API_V1_PREFIX)
 app.include_router(tasks.router, prefix=settings.API_V1_PREFIX)
 app.include_router(config.router, prefix=settings.API_V1_PREFIX)
 app.include_router(config.router, prefix=settings.API_V1_PREFIX)
+app.include_router(metrics.router, prefix=settings.API_V1_PREFIX)
 
 # 挂载静态文件
 frontend_dist = Path(__file__).parent.parent / "frontend" / "dist"
@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试公共配置：在导入应用模块前指向临时数据库，避免读写 data/ 下的正式数据
+"""
+
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="12306-test-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["DEBUG"] = "false"
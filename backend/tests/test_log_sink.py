@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务日志合并测试
+"""
+
+import pytest
+
+from app.models.task import china_now
+from app.tasks.log_sink import TaskLogSink, compaction_key
+
+
+@pytest.fixture
+def sink():
+    """独立的日志写入器实例（不影响全局单例）"""
+    saved = TaskLogSink._instance
+    TaskLogSink._instance = None
+    try:
+        yield TaskLogSink()
+    finally:
+        TaskLogSink._instance = saved
+
+
+def _record(message: str, task_id: int = 1, level: str = "info", details: str = None) -> dict:
+    return {
+        "task_id": task_id, "level": level, "message": message, "details": details,
+        "created_at": china_now(), "repeat_count": 1, "last_at": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "a, b, same",
+    [
+        (("info", "第 1 次刷票...", None), ("info", "第 25 次刷票...", None), True),
+        (("info", "扫描结束: G1[二等座:无]", None), ("info", "扫描结束: G1[二等座:无]", None), True),
+        (("info", "扫描结束: G1[二等座:无]", None), ("info", "扫描结束: G1[二等座:有]", None), False),
+        (("info", "第 1 次刷票...", None), ("warning", "第 1 次刷票...", None), False),
+        (("warning", "下单失败", "a 1ms"), ("warning", "下单失败", "a 2ms"), False),
+        (("info", "第 1 次刷票...完成", None), ("info", "第 2 次刷票...完成", None), False),
+    ],
+)
+def test_compaction_key(a, b, same):
+    assert (compaction_key(*a) == compaction_key(*b)) is same
+
+
+@pytest.mark.parametrize(
+    "messages, expected",
+    [
+        # 刷票进度与扫描结果交替出现时各自合并
+        (
+            ["第 1 次刷票...", "扫描结束: 无票", "第 2 次刷票...", "扫描结束: 无票", "第 3 次刷票..."],
+            [("第 3 次刷票...", 3), ("扫描结束: 无票", 2)],
+        ),
+        # 出现新的日志种类后，之前的合并结束，另起新行
+        (
+            ["第 1 次刷票...", "扫描结束: 无票", "发现余票", "第 2 次刷票..."],
+            [("第 1 次刷票...", 1), ("扫描结束: 无票", 1), ("发现余票", 1), ("第 2 次刷票...", 1)],
+        ),
+        (["a", "a", "a"], [("a", 3)]),
+    ],
+)
+def test_compact_folds_runs(sink, messages, expected):
+    new_runs, updated = sink._compact([_record(m) for m in messages])
+    assert [(run.row["message"], run.row["repeat_count"]) for run in new_runs] == expected
+    assert updated == []
+
+
+def test_compact_updates_written_rows(sink):
+    new_runs, _ = sink._compact([_record("第 1 次刷票...")])
+    new_runs[0].id = 42  # 已写入数据库
+
+    new_runs, updated = sink._compact([_record("第 2 次刷票..."), _record("第 3 次刷票...")])
+    assert new_runs == []
+    assert [(run.id, run.row["repeat_count"], run.row["message"]) for run in updated] == [(42, 3, "第 3 次刷票...")]
+
+
+def test_compact_per_task_and_end_runs(sink):
+    sink._compact([_record("x", task_id=1)])
+    new_runs, _ = sink._compact([_record("x", task_id=2), _record("x", task_id=1)])
+    assert [run.row["task_id"] for run in new_runs] == [2]
+
+    sink.end_runs(1)
+    new_runs, _ = sink._compact([_record("x", task_id=1)])
+    assert len(new_runs) == 1
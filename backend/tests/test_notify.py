@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+通知渠道推送结果测试：只有渠道接口确认成功才计为推送成功
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.utils import notify
+
+
+def _send(monkeypatch, config: dict, handler) -> dict:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(notify, "_http", lambda proxy=None: client)
+
+    async def run():
+        try:
+            return await notify.send_async(
+                "标题", "内容", timeout=1.0, retries=0,
+                plan=notify.compile_plan(dict(config, HITOKOTO="false")), urgent=True
+            )
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def _reply(status: int = 200, **payload):
+    return lambda request: httpx.Response(status, json=payload)
+
+
+def _network_error(request):
+    raise httpx.ConnectError("unreachable", request=request)
+
+
+BARK = {"BARK_PUSH": "https://bark.test/key"}
+DINGDING = {"DD_BOT_TOKEN": "token", "DD_BOT_SECRET": "secret"}
+NTFY = {"NTFY_URL": "https://ntfy.test", "NTFY_TOPIC": "topic"}
+PUSHPLUS = {"PUSH_PLUS_TOKEN": "token"}
+
+
+@pytest.mark.parametrize(
+    "config, handler, channel, expected",
+    [
+        (BARK, _reply(code=200), "bark", True),
+        (BARK, _reply(code=400, message="invalid key"), "bark", False),
+        (BARK, _network_error, "bark", False),
+        (DINGDING, _reply(errcode=0), "dingding_bot", True),
+        (DINGDING, _reply(errcode=310000, errmsg="sign not match"), "dingding_bot", False),
+        (NTFY, _reply(200), "ntfy", True),
+        (NTFY, _reply(403), "ntfy", False),
+        (PUSHPLUS, _reply(code=200, data="flow-id"), "pushplus_bot", True),
+        (PUSHPLUS, _reply(code=903, msg="token 无效"), "pushplus_bot", False),
+    ],
+)
+def test_channel_result(monkeypatch, config, handler, channel, expected):
+    assert _send(monkeypatch, config, handler) == {channel: expected}
+
+
+SMTP = {
+    "SMTP_SERVER": "smtp.test:465", "SMTP_SSL": "true", "SMTP_EMAIL": "a@test",
+    "SMTP_PASSWORD": "x", "SMTP_NAME": "12306",
+}
+
+
+@pytest.mark.parametrize(
+    "delay, error, expected",
+    [
+        # 发送耗时超过渠道超时：不中断等待，以线程中的实际结果为准
+        (0.3, None, True),
+        # 套接字超时：不重试，避免重复发送
+        (0.0, TimeoutError("timed out"), False),
+        (0.0, OSError("connection refused"), False),
+    ],
+)
+def test_smtp_sent_once(monkeypatch, delay, error, expected):
+    calls = []
+
+    def sendmail(cfg, message):
+        calls.append(cfg["SMTP_SERVER"])
+        time.sleep(delay)
+        if error is not None:
+            raise error
+
+    monkeypatch.setattr(notify, "_smtp_sendmail", sendmail)
+
+    async def run():
+        return await notify.send_async(
+            "标题", "内容", timeout=0.1, retries=2,
+            plan=notify.compile_plan(dict(SMTP, HITOKOTO="false")), urgent=True
+        )
+
+    assert asyncio.run(run()) == {"smtp": expected}
+    assert len(calls) == 1
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+下单流程测试（排队信息解析、确认订单超时、出票轮询）
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.order_service import OrderService, OrderToken, Passenger, _pending_confirms
+
+
+class _Train:
+    """buy_ticket 只透传车次信息，测试中任意属性均返回空串"""
+
+    def __getattr__(self, name):
+        return ""
+
+
+def _make_service(confirm, poll_data):
+    """
+    构造跳过前置步骤的下单服务
+
+    Args:
+        confirm: 替换 confirm_order 的协程函数
+        poll_data: queryOrderWaitTime 返回的 data 字段
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path.endswith("/queryOrderWaitTime")
+        return httpx.Response(200, json={"status": True, "data": poll_data})
+
+    service = OrderService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service.STEP_BUDGETS = dict(OrderService.STEP_BUDGETS, confirm_order=0.05)
+    service.POLL_MIN_INTERVAL = 0.02
+
+    async def ok(*args, **kwargs):
+        return True, ""
+
+    async def init_dc():
+        service._order_token = OrderToken()
+        return True, ""
+
+    async def queue_count(*args, **kwargs):
+        return True, 10, 0, ""
+
+    service.submit_order_request = ok
+    service.init_dc = init_dc
+    service.check_order_info = ok
+    service.get_queue_count = queue_count
+    service.confirm_order = confirm
+    return service
+
+
+async def _buy(service, wait=0.3):
+    return await service.buy_ticket(
+        train_info=_Train(), secret_str="x",
+        passengers=[Passenger(passenger_name="张三", passenger_id_no="1")],
+        deadline=time.monotonic() + wait
+    )
+
+
+@pytest.mark.parametrize(
+    "confirm_delay, confirm_result, poll_data, success, unknown, step",
+    [
+        # 确认订单超出预算但订单已排上：不取消请求，轮询查到订单号
+        (1.0, (True, ""), {"waitTime": 0, "orderId": "E123"}, True, False, ""),
+        # 确认订单超出预算且截止前未查到结果：结果未知
+        (1.0, (True, ""), {"waitTime": 30, "waitCount": 5}, False, True, "query_order_wait_time"),
+        # 确认订单超出预算，12306 表示无订单，但确认请求仍未返回：结果未知
+        (1.0, (True, ""), {"waitTime": -1, "msg": "无订单"}, False, True, "query_order_wait_time"),
+        # 确认成功但出票排队超过截止时间：结果未知
+        (0.0, (True, ""), {"waitTime": 30, "waitCount": 5}, False, True, "query_order_wait_time"),
+        # 确认订单明确失败：失败
+        (0.0, (False, "余票不足"), {"waitTime": 0, "orderId": "E123"}, False, False, "confirm_order"),
+        # 出票明确失败：失败
+        (0.0, (True, ""), {"waitTime": -2, "msg": "出票失败"}, False, False, "query_order_wait_time"),
+    ],
+)
+def test_buy_ticket_confirm_outcome(confirm_delay, confirm_result, poll_data, success, unknown, step):
+    async def run():
+        calls = []
+
+        async def confirm(*args, **kwargs):
+            calls.append("start")
+            await asyncio.sleep(confirm_delay)
+            calls.append("done")
+            return confirm_result
+
+        service = _make_service(confirm, poll_data)
+        result = await _buy(service)
+        # 确认请求从未被取消
+        pending = list(_pending_confirms)
+        assert all(not task.cancelled() for task in pending)
+        for task in pending:
+            task.cancel()
+        await service._client.aclose()
+        return result, calls
+
+    result, calls = asyncio.run(run())
+    assert calls[0] == "start"
+    assert result.success is success
+    assert result.unknown is unknown
+    assert result.step == step
+    assert "confirm_order" in result.step_times
+
+
+@pytest.mark.parametrize(
+    "wait_time, wait_count, expected",
+    [
+        (-1, 0, OrderService.POLL_MIN_INTERVAL),      # 无预估、无排队
+        (-100, 0, OrderService.POLL_MIN_INTERVAL),    # 排队中但无人数
+        (-4, 20, 2.0),                                # 按排队人数
+        (-4, 1000, OrderService.POLL_MAX_INTERVAL),   # 排队人数过多时封顶
+        (4, 0, 2.0),                                  # 按预估出票时间的一半
+        (1, 100, OrderService.POLL_MIN_INTERVAL),     # 临近出票，下限
+        (600, 0, OrderService.POLL_MAX_INTERVAL),     # 预估很长，上限
+    ],
+)
+def test_next_poll_delay(wait_time, wait_count, expected):
+    assert OrderService()._next_poll_delay(wait_time, wait_count) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "data_info, expected",
+    [
+        ({"ticket": "21,0", "countT": "3"}, (21, 3)),
+        ({"ticket": "0,5", "countT": "0"}, (0, 0)),
+        ({"ticket": "7", "countT": 12}, (7, 12)),
+        ({"ticket": "", "countT": "3"}, (None, 3)),
+        ({"ticket": "充足", "countT": "3"}, (None, 3)),
+        ({"ticket": "-1,0", "countT": ""}, (None, None)),
+        ({"countT": "3"}, (None, 3)),
+        ({"ticket": "5,0"}, (5, None)),
+        ({"ticket": None, "countT": None}, (None, None)),
+    ],
+)
+def test_parse_queue_count(data_info, expected):
+    assert OrderService.parse_queue_count(data_info) == expected
+
+
+@pytest.mark.parametrize(
+    "ticket_count, queue_count, ratio, expected",
+    [
+        (0, 0, 1.0, True),        # 明确无票
+        (0, None, 1.0, True),
+        (10, 11, 1.0, True),      # 排队超过余票
+        (10, 10, 1.0, False),
+        (10, 25, 2.0, True),
+        (10, 20, 2.0, False),
+        (None, 100, 1.0, False),  # 余票未知，不放弃
+        (None, None, 1.0, False),
+        (10, None, 1.0, False),   # 排队人数未知，不放弃
+    ],
+)
+def test_queue_exceeds_tickets(ticket_count, queue_count, ratio, expected):
+    assert OrderService.queue_exceeds_tickets(ticket_count, queue_count, ratio) is expected
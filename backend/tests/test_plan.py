@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务执行计划测试（乘车人匹配、车次筛选、余票判断）
+"""
+
+import json
+
+import pytest
+
+from app.models.task import Task
+from app.services.order_service import Passenger
+from app.services.query_service import TrainInfo
+from app.tasks.plan import compile_task_plan, seat_available
+
+
+def _task(**kwargs) -> Task:
+    values = dict(
+        id=1, from_station="北京", to_station="上海", train_date="2099-01-01",
+        auto_submit=True, seat_types="O", passengers="[]",
+    )
+    values.update(kwargs)
+    return Task(**values)
+
+
+def _train(code: str, start_time: str = "08:00") -> TrainInfo:
+    return TrainInfo(
+        train_no="", train_code=code, start_station="", end_station="",
+        from_station="", to_station="", from_station_code="", to_station_code="",
+        start_time=start_time, arrive_time="", duration="", can_buy=True, train_date="",
+    )
+
+
+ACCOUNT_PASSENGERS = [
+    ("张三", "110101199001011234", "1"),
+    ("李四", "110101200501011234", "3"),
+    ("王五", "110101198001011234", "1"),
+]
+
+
+@pytest.mark.parametrize(
+    "task_passengers, expected",
+    [
+        # 按姓名和证件号匹配，保持账号乘车人顺序
+        (
+            [{"passenger_name": "王五", "passenger_id_no": "110101198001011234"},
+             {"passenger_name": "张三", "passenger_id_no": "110101199001011234"}],
+            [("张三", "1"), ("王五", "1")],
+        ),
+        # 任务指定的乘客类型覆盖购票类型（学生买成人票）
+        (
+            [{"passenger_name": "李四", "passenger_id_no": "110101200501011234", "passenger_type": "1"}],
+            [("李四", "1")],
+        ),
+        # 未指定乘客类型时沿用 12306 返回值
+        (
+            [{"passenger_name": "李四", "passenger_id_no": "110101200501011234"}],
+            [("李四", "3")],
+        ),
+        # 姓名相同但证件号不同不匹配
+        ([{"passenger_name": "张三", "passenger_id_no": "000000000000000000"}], []),
+        ([], []),
+    ],
+)
+def test_match_passengers(task_passengers, expected):
+    plan = compile_task_plan(_task(passengers=json.dumps(task_passengers, ensure_ascii=False)))
+    api_passengers = [
+        Passenger(passenger_name=name, passenger_id_no=id_no, passenger_type=p_type, ticket_type=p_type)
+        for name, id_no, p_type in ACCOUNT_PASSENGERS
+    ]
+    matched = plan.match_passengers(api_passengers)
+    assert [(p.passenger_name, p.ticket_type) for p in matched] == expected
+
+
+def test_invalid_passengers_json():
+    plan = compile_task_plan(_task(passengers="not json"))
+    assert dict(plan.passengers) == {}
+
+
+@pytest.mark.parametrize(
+    "task_kwargs, expected_candidates, expected_trains",
+    [
+        ({}, ["G1", "D2", "K3", "G4"], ["G1", "D2", "K3", "G4"]),
+        ({"train_types": "G,D"}, ["G1", "D2", "G4"], ["G1", "D2", "G4"]),
+        ({"train_codes": "G4, K3"}, ["G1", "D2", "K3", "G4"], ["K3", "G4"]),
+        ({"start_time_range": "07:00-12:00"}, ["G1", "D2"], ["G1", "D2"]),
+        ({"start_time_range": "bad"}, ["G1", "D2", "K3", "G4"], ["G1", "D2", "K3", "G4"]),
+        ({"train_types": "G", "train_codes": "D2"}, ["G1", "G4"], []),
+    ],
+)
+def test_match_trains(task_kwargs, expected_candidates, expected_trains):
+    plan = compile_task_plan(_task(**task_kwargs))
+    trains = [_train("G1", "07:00"), _train("D2", "12:00"), _train("K3", "12:01"), _train("G4", "23:59")]
+    candidates, selected = plan.match_trains(trains)
+    assert [t.train_code for t in candidates] == expected_candidates
+    assert [t.train_code for t in selected] == expected_trains
+
+
+@pytest.mark.parametrize(
+    "seat_count, expected",
+    [("有", True), ("5", True), ("0", False), ("无", False), ("--", False), ("*", False), ("", False), ("候补", False)],
+)
+def test_seat_available(seat_count, expected):
+    assert seat_available(seat_count) is expected
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+调度器测试：确认订单发出后停止或中断任务，不丢失下单结果
+"""
+
+import asyncio
+import json
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+import app.models  # noqa: F401  注册数据表
+from app.core.database import AsyncSessionLocal, init_db, close_db
+from app.models.task import Task, TaskStatus
+from app.models.user import User
+from app.services.order_service import OrderResult, OrderService, OrderToken, Passenger
+from app.services.order_session import OrderSession, get_order_session_pool
+from app.services.query_service import QueryService, TrainInfo
+from app.tasks.scheduler import get_scheduler
+
+PASSENGER = ("张三", "110101199001011234")
+
+
+@pytest.fixture
+def fake_12306(monkeypatch):
+    """替换 12306 接口：有票、各步骤成功，确认订单和等待出票各耗时 0.3 秒"""
+    train = TrainInfo(
+        train_no="240000G1010", train_code="G101", start_station="北京南", end_station="上海虹桥",
+        from_station="北京南", to_station="上海虹桥", from_station_code="VNP", to_station_code="AOH",
+        start_time="07:00", arrive_time="12:00", duration="05:00", can_buy=True, train_date="20990101",
+        second_seat="有", secret_str="secret",
+    )
+
+    async def query(self, **kwargs):
+        return [train], None
+
+    async def ok(self, *args, **kwargs):
+        return True, ""
+
+    async def init_dc(self):
+        self._order_token = OrderToken()
+        return True, ""
+
+    async def queue_count(self, *args, **kwargs):
+        return True, 10, 0, ""
+
+    async def confirm(self, *args, **kwargs):
+        await asyncio.sleep(0.3)
+        return True, ""
+
+    async def wait_result(self, deadline=None):
+        await asyncio.sleep(0.3)
+        return OrderResult(success=True, order_id="E123456789", message="出票成功")
+
+    async def passengers(self, force=False):
+        return True, [Passenger(passenger_name=PASSENGER[0], passenger_id_no=PASSENGER[1])], ""
+
+    async def refresh(self):
+        return None
+
+    monkeypatch.setattr(QueryService, "query", query)
+    monkeypatch.setattr(OrderService, "submit_order_request", ok)
+    monkeypatch.setattr(OrderService, "init_dc", init_dc)
+    monkeypatch.setattr(OrderService, "check_order_info", ok)
+    monkeypatch.setattr(OrderService, "get_queue_count", queue_count)
+    monkeypatch.setattr(OrderService, "confirm_order", confirm)
+    monkeypatch.setattr(OrderService, "query_order_wait_time", wait_result)
+    monkeypatch.setattr(OrderSession, "get_passengers", passengers)
+    monkeypatch.setattr(OrderSession, "refresh", refresh)
+
+
+async def _start_tick(scheduler, notifications):
+    """创建运行中的任务并触发一次节拍，返回 (任务 ID, 节拍)"""
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        user = User(username=uuid.uuid4().hex, session_data=json.dumps({"cookies": {"tk": "x"}}))
+        db.add(user)
+        await db.flush()
+        task = Task(
+            user_id=user.id, name="test", from_station="北京", to_station="上海", train_date="2099-01-01",
+            seat_types="O", status=TaskStatus.RUNNING, query_interval=3600,
+            passengers=json.dumps([{"passenger_name": PASSENGER[0], "passenger_id_no": PASSENGER[1]}]),
+        )
+        db.add(task)
+        await db.commit()
+
+    scheduler.notifier.submit = lambda title, content, urgent=False: notifications.append((title, urgent))
+    scheduler._active_tasks[task.id] = True
+    scheduler.state_store.load(task)
+    scheduler.ticker.start()
+    scheduler.ticker.add(task.id, 3600)
+
+    # 等待节拍进入确认订单阶段
+    for _ in range(200):
+        if task.id in scheduler._confirmed_ticks:
+            break
+        await asyncio.sleep(0.01)
+    assert task.id in scheduler._confirmed_ticks
+    return task.id, scheduler.ticker.current_tick(task.id)
+
+
+async def _task_row(task_id: int) -> Task:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Task).where(Task.id == task_id))).scalar_one()
+
+
+async def _cleanup(scheduler):
+    scheduler.ticker.shutdown()
+    await get_order_session_pool().close()
+    await scheduler.span_recorder.stop()
+    await close_db()
+
+
+def test_stop_during_confirm_wait_keeps_order(fake_12306):
+    """确认订单后停止任务：节拍不被取消，仍记录成功并推送通知"""
+    async def run():
+        scheduler = get_scheduler()
+        notifications = []
+        try:
+            task_id, tick = await _start_tick(scheduler, notifications)
+            await scheduler.stop_task(task_id)
+            assert not tick.done()
+
+            await asyncio.wait_for(tick, timeout=5)
+            assert not tick.cancelled()
+            row = await _task_row(task_id)
+            assert row.status == TaskStatus.SUCCESS
+            assert row.order_id == "E123456789"
+            assert [urgent for title, urgent in notifications if "抢票成功" in title] == [True]
+        finally:
+            await _cleanup(scheduler)
+
+    asyncio.run(run())
+
+
+def test_cancel_after_confirm_pauses_with_unknown_result(fake_12306):
+    """确认订单后节拍仍被强制取消（如服务关闭）：按结果未知暂停任务并推送紧急通知"""
+    async def run():
+        scheduler = get_scheduler()
+        notifications = []
+        try:
+            task_id, tick = await _start_tick(scheduler, notifications)
+            tick.cancel()
+            await asyncio.wait({tick})
+            await asyncio.wait_for(asyncio.gather(*scheduler._outcome_tasks), timeout=5)
+
+            row = await _task_row(task_id)
+            assert row.status == TaskStatus.PAUSED
+            assert "结果未知" in row.result_message
+            assert [urgent for title, urgent in notifications if "下单结果未知" in title] == [True]
+            assert task_id not in scheduler._active_tasks
+        finally:
+            await _cleanup(scheduler)
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+车站搜索索引测试（精确、前缀、子串匹配与排序）
+"""
+
+import pytest
+
+from app.services.station_index import StationIndex
+
+# 按热度排序：(站名, 拼音, 简拼)
+STATIONS = [
+    ("北京", "beijing", "bj"),
+    ("上海", "shanghai", "sh"),
+    ("北京南", "beijingnan", "bjn"),
+    ("南京", "nanjing", "nj"),
+    ("上海虹桥", "shanghaihongqiao", "shhq"),
+    ("北", "bei", "b"),
+    ("BJX", "", ""),
+]
+
+
+def _names(ids):
+    return [STATIONS[i][0] for i in ids]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return StationIndex(STATIONS)
+
+
+@pytest.mark.parametrize(
+    "keyword, expected",
+    [
+        # 精确匹配优先于前缀匹配，前缀匹配优先于子串匹配
+        ("北", ["北", "北京", "北京南"]),
+        ("北京", ["北京", "北京南"]),
+        ("南京", ["南京"]),
+        ("南", ["南京", "北京南"]),
+        ("京", ["北京", "北京南", "南京"]),
+        # 拼音、简拼，不区分大小写并忽略首尾空白
+        ("bj", ["北京", "北京南", "BJX"]),
+        (" BeiJing ", ["北京", "北京南"]),
+        ("nan", ["南京", "北京南"]),
+        ("b", ["北", "北京", "北京南", "BJX"]),
+        ("hq", ["上海虹桥"]),
+        ("ghai", ["上海", "上海虹桥"]),
+        # 同一站点多个键命中时只出现一次
+        ("sh", ["上海", "上海虹桥"]),
+        ("bjx", ["BJX"]),
+        # 无匹配
+        ("广州", []),
+        ("jb", []),
+        ("", []),
+        ("   ", []),
+    ],
+)
+def test_search(index, keyword, expected):
+    assert _names(index.search(keyword)) == expected
+
+
+@pytest.mark.parametrize("limit, expected", [(1, ["北"]), (2, ["北", "北京"]), (0, []), (-1, [])])
+def test_search_limit(index, limit, expected):
+    assert _names(index.search("北", limit=limit)) == expected
+
+
+def test_prefix_results_capped():
+    keys = [(f"站{i}", f"zhan{i}", "") for i in range(StationIndex.MAX_PREFIX_RESULTS + 50)]
+    index = StationIndex(keys)
+    ids = index.search("zhan", limit=StationIndex.MAX_PREFIX_RESULTS + 50)
+    # 前缀节点截断后，其余站点仍可通过子串匹配按热度顺序补齐
+    assert ids == list(range(len(keys)))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+刷票节拍器测试（首个节拍立即触发、之后按相位错开）
+"""
+
+import asyncio
+import time
+
+from app.tasks.ticker import TickEngine
+
+
+def _run_ticks(task_count: int, interval: float, duration: float):
+    """运行节拍器，返回各任务每次节拍相对启动时刻的时间（秒）"""
+    async def run():
+        fired = {task_id: [] for task_id in range(task_count)}
+        start = time.monotonic()
+
+        async def callback(task_id: int):
+            fired[task_id].append(time.monotonic() - start)
+
+        ticker = TickEngine(callback)
+        ticker.start()
+        for task_id in range(task_count):
+            ticker.add(task_id, interval)
+        await asyncio.sleep(duration)
+        ticker.shutdown()
+        return fired
+
+    return asyncio.run(run())
+
+
+def test_first_tick_is_immediate():
+    fired = _run_ticks(task_count=5, interval=1.0, duration=0.1)
+    for times in fired.values():
+        assert len(times) == 1
+        assert times[0] < 0.05
+
+
+def test_later_ticks_are_spread_and_periodic():
+    interval = 0.2
+    fired = _run_ticks(task_count=5, interval=interval, duration=0.65)
+    second = sorted(times[1] for times in fired.values())
+    # 第二个节拍在一个间隔内触发且彼此错开
+    assert all(0 < t <= interval + 0.05 for t in second)
+    assert min(b - a for a, b in zip(second, second[1:])) > 0.01
+    # 之后每个间隔触发一次
+    for times in fired.values():
+        gaps = [b - a for a, b in zip(times[1:], times[2:])]
+        assert gaps and all(abs(gap - interval) < 0.05 for gap in gaps)
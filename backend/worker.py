@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+12306 自动化抢票系统 - 调度 worker 入口
+
+与 API 进程分离部署时使用（API 进程设置 SCHEDULER_EMBEDDED=false）：
+worker 通过任务租约认领运行中的任务并执行刷票，可在一台或多台主机上启动多个实例，
+某个 worker 退出或失联后其任务会在租约过期后被其他 worker 接管
+
+启动命令:
+    python worker.py
+"""
+import sys
+import signal
+import asyncio
+from pathlib import Path
+
+# 添加父目录到路径（用于导入原始脚本模块）
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import get_settings, ensure_directories
+from app.core.logging import setup_logging
+from app.core.database import init_db, close_db
+from app.core.http import close_shared_transport
+from app.services.order_session import get_order_session_pool
+from app.services.query_service import StationManager
+from app.tasks.scheduler import get_scheduler
+
+settings = get_settings()
+
+
+async def main():
+    print("\n" + "=" * 50)
+    print(f"🚄 {settings.APP_NAME} v{settings.APP_VERSION} - 调度 worker")
+    print("=" * 50)
+    
+    ensure_directories()
+    setup_logging()
+    # 预加载车站数据并建立搜索索引
+    StationManager().load_from_file(settings.STATION_FILE)
+    await init_db()
+    
+    # 启动调度器（租约模式）
+    scheduler = get_scheduler()
+    scheduler.start(use_leases=True)
+    print(f"[启动] worker {scheduler.lease_manager.worker_id} 已启动")
+    
+    # 等待退出信号
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows 不支持 add_signal_handler，依赖 KeyboardInterrupt
+            pass
+    
+    try:
+        await stop_event.wait()
+    finally:
+        print("\n[关闭] 正在关闭 worker...")
+        
+        # 关闭调度器（释放租约，其他 worker 可立即接管）
+        await scheduler.shutdown()
+        
+        # 关闭下单会话和 12306 连接池
+        await get_order_session_pool().close()
+        await close_shared_transport()
+        
+        # 关闭数据库连接
+        await close_db()
+        
+        print("[关闭] worker 已关闭\n")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass